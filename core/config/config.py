@@ -20,6 +20,30 @@ class JWTSettings(BaseSettings):
     key: str = 'key'
     algorithm: str = 'algorithm'
 
+class StorageSettings(BaseModel):
+    root: str = 'uploads/blobs'
+    limit: int = 100 * 1024 * 1024  # максимальный размер загружаемого файла, байт
+    workers: int = 2  # процессов для построения миниатюр
+    # Префикс internal-location nginx, указывающего на root (APP_STORAGE_REDIRECT): файлы хранилища
+    # отдает nginx по X-Accel-Redirect (sendfile, Range). Пусто - отдает само приложение
+    redirect: str = ''
+
+class ParseCacheSettings(BaseModel):
+    # Однословные имена: '_' в переменных окружения - разделитель вложенности (APP_CACHE_SIZE)
+    size: int = 100000  # максимум записей кэша разбора для текущей версии парсера
+    trim: int = 100  # кэш обрезается до size после каждой trim-й записи
+
+class AcceptanceSettings(BaseModel):
+    profile: str = 'default'  # активный профиль приемки: имя (последняя версия) или имя:версия
+    file: str = ''  # JSON-файл со списком профилей приемки (APP_ACCEPTANCE_FILE), дополняет встроенный default
+
+class ChatSettings(BaseModel):
+    history: int = 50  # сообщений в первом кадре истории при подключении
+    limit: int = 200  # максимум сообщений за один запрос более старой истории
+    buffer: int = 500  # последних сообщений в памяти процесса для выдачи истории без запросов к БД
+    queue: int = 256  # исходящих кадров в очереди подключения, при переполнении клиент отключается
+    backplane: str = 'postgres'  # рассылка между воркерами: postgres (LISTEN/NOTIFY) или memory (один процесс)
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file = ".env",
@@ -31,5 +55,9 @@ class Settings(BaseSettings):
     api: ApiPrefix = ApiPrefix()
     db: DBSettings = DBSettings()
     jwt: JWTSettings = JWTSettings()
+    storage: StorageSettings = StorageSettings()
+    cache: ParseCacheSettings = ParseCacheSettings()
+    acceptance: AcceptanceSettings = AcceptanceSettings()
+    chat: ChatSettings = ChatSettings()
 
 settings = Settings()
\ No newline at end of file
@@ -1,14 +1,22 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from core.config.dependencies import get_db_settings
+from core.config.config import settings as app_settings
 
-settings = get_db_settings()
+# Настройки берутся напрямую из config: core.config.dependencies импортирует этот модуль
+settings = app_settings.db
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.username}:{settings.password}@{settings.host}:{settings.port}/{settings.database}"
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный доступ (asyncpg) для подсистемы сообщений, работающей в цикле событий
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.username}:{settings.password}@{settings.host}:{settings.port}/{settings.database}"
+
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Model = declarative_base()
\ No newline at end of file
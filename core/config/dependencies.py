@@ -1,5 +1,6 @@
 from functools import lru_cache
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from core.config.config import settings
@@ -12,6 +13,10 @@ def get_db() -> Session:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncSession:
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
 @lru_cache
 def get_db_settings() -> settings.db:
     return settings.db
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Версионные миграции схемы БД.
+
+Каждая миграция - модуль core/migrations/versions/NNNN_<name>.py с функцией
+upgrade(connection). Применяются по порядку номеров, примененные версии
+хранятся в таблице schema_migrations. Миграции пишутся идемпотентно
+(IF NOT EXISTS): начальная миграция создает схему по текущим моделям,
+и последующие шаги на новой базе ничего не меняют.
+
+Миграция с transactional = False выполняется в режиме autocommit - так
+работают CREATE INDEX CONCURRENTLY и пакетные обновления, не блокирующие
+таблицы на время всей миграции.
+
+Запуск: python -m core.migrations
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+from types import ModuleType
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from . import versions
+
+# Ключ advisory lock: миграции не выполняются одновременно из нескольких процессов
+LOCK_KEY = 7_340_001
+
+
+def load_migrations() -> List[ModuleType]:
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+        if info.name[:4].isdigit()
+    ]
+    return sorted(modules, key=lambda module: module.__name__)
+
+
+def version_of(migration: ModuleType) -> str:
+    return migration.__name__.rsplit(".", 1)[1]
+
+
+def applied_versions(engine: Engine) -> set:
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade(engine: Engine, log=print) -> List[str]:
+    """Применяет все неприменные миграции, возвращает их версии"""
+    applied = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+        try:
+            done = applied_versions(engine)
+            for migration in load_migrations():
+                version = version_of(migration)
+                if version in done:
+                    continue
+                log(f"Применяется миграция {version}")
+                if getattr(migration, "transactional", True):
+                    with engine.begin() as conn:
+                        migration.upgrade(conn)
+                        _mark_applied(conn, version)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        migration.upgrade(conn)
+                        _mark_applied(conn, version)
+                applied.append(version)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+    return applied
+
+
+def _ensure_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version VARCHAR PRIMARY KEY,"
+        " applied_at TIMESTAMP NOT NULL"
+        ")"
+    ))
+
+
+def _mark_applied(conn, version: str):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"),
+        {"version": version, "applied_at": datetime.now()}
+    )
@@ -0,0 +1,25 @@
+import argparse
+
+from core.config.database import engine
+from . import upgrade, applied_versions, load_migrations, version_of
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--list", action="store_true", help="Показать миграции и их состояние")
+    args = parser.parse_args()
+
+    if args.list:
+        done = applied_versions(engine)
+        for migration in load_migrations():
+            version = version_of(migration)
+            mark = "x" if version in done else " "
+            print(f"[{mark}] {version}  {(migration.__doc__ or '').strip()}")
+        return
+
+    applied = upgrade(engine)
+    print(f"Применено миграций: {len(applied)}" if applied else "Схема БД актуальна")
+
+
+if __name__ == "__main__":
+    main()
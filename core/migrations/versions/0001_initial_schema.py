@@ -0,0 +1,14 @@
+"""Начальная схема: таблицы по текущим моделям (существующие таблицы не меняются)"""
+from core.config.database import Model
+
+# Регистрация всех моделей в метаданных
+import user.model  # noqa: F401
+import report.model  # noqa: F401
+import report_data.model  # noqa: F401
+import message.model  # noqa: F401
+import product.model  # noqa: F401
+import storage.model  # noqa: F401
+
+
+def upgrade(connection):
+    Model.metadata.create_all(bind=connection)
@@ -0,0 +1,15 @@
+"""Колонки хранилища файлов, версии парсера и даты проверки в таблицах, созданных до их появления"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    "ALTER TABLE reports ADD COLUMN IF NOT EXISTS file_hash VARCHAR(64) REFERENCES blobs (hash)",
+    "ALTER TABLE reports ADD COLUMN IF NOT EXISTS file_name VARCHAR",
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS file_hash VARCHAR(64) REFERENCES blobs (hash)",
+    "ALTER TABLE reports_data ADD COLUMN IF NOT EXISTS parser_version INTEGER",
+    "ALTER TABLE reports_data ADD COLUMN IF NOT EXISTS tested_on DATE",
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
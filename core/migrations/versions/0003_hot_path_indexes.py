@@ -0,0 +1,33 @@
+"""Индексы горячих выборок (создаются CONCURRENTLY, без блокировки записи)"""
+from sqlalchemy import text
+
+transactional = False
+
+INDEXES = [
+    "ix_reports_ts_id ON reports (ts, id)",
+    "ix_reports_data_department_system_type ON reports_data (department, system_type, report_id)",
+    "ix_reports_data_system_type ON reports_data (system_type, report_id)",
+    "ix_reports_data_system_number ON reports_data (system_number)",
+    "ix_reports_data_tested_on ON reports_data (tested_on)",
+    "ix_reports_data_year ON reports_data (year)",
+    "ix_reports_data_report_id ON reports_data (report_id)",
+    "ix_reports_data_uncalculated ON reports_data (id) WHERE calculated = false",
+    "ix_reports_data_unverified ON reports_data (id) WHERE is_accepted IS NULL",
+    "ix_reports_data_status ON reports_data (is_accepted, id) WHERE is_accepted IS NOT NULL",
+    "ix_messages_ts_active ON messages (ts) WHERE is_deleted = false",
+    "ix_messages_file_hash ON messages (file_hash)",
+    "ix_products_report_number ON products (report_number)",
+]
+
+
+def upgrade(connection):
+    for index in INDEXES:
+        name = index.split(" ", 1)[0]
+        # Индекс, оставшийся невалидным после прерванного CREATE INDEX CONCURRENTLY, пересоздается
+        connection.execute(text(
+            "DO $$ BEGIN "
+            "IF EXISTS (SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            f"WHERE c.relname = '{name}' AND NOT i.indisvalid) THEN EXECUTE 'DROP INDEX {name}'; END IF; "
+            "END $$"
+        ))
+        connection.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index}"))
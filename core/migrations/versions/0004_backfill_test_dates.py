@@ -0,0 +1,49 @@
+"""Заполнение даты и года проверки у ранее загруженных отчетов (пакетами)"""
+import re
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+
+transactional = False
+
+BATCH_SIZE = 1000
+# Разбор даты зафиксирован на момент миграции и не зависит от кода приложения
+TEST_DATE_PATTERN = re.compile(r"(\d{1,2})[./-](\d{1,2})[./-](\d{2,4})")
+
+
+def _parse_test_date(value: Optional[str]) -> Optional[date]:
+    match = TEST_DATE_PATTERN.search(value or "")
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def upgrade(connection):
+    # Каждый пакет фиксируется отдельно (autocommit), прерванная миграция продолжается с начала незаполненных строк
+    last_id = 0
+    while rows := connection.execute(
+        text(
+            "SELECT id, test_date FROM reports_data"
+            " WHERE tested_on IS NULL AND test_date IS NOT NULL AND id > :last_id"
+            " ORDER BY id LIMIT :limit"
+        ),
+        {"last_id": last_id, "limit": BATCH_SIZE}
+    ).all():
+        last_id = rows[-1][0]
+        dates = [
+            {"id": id, "tested_on": tested_on, "year": tested_on.year}
+            for id, tested_on in ((id, _parse_test_date(test_date)) for id, test_date in rows)
+            if tested_on is not None
+        ]
+        if dates:
+            connection.execute(
+                text("UPDATE reports_data SET tested_on = :tested_on, year = :year WHERE id = :id"),
+                dates
+            )
@@ -0,0 +1,18 @@
+"""Индекс истории чата (is_deleted, ts, id) вместо частичного индекса по ts"""
+from sqlalchemy import text
+
+transactional = False
+
+
+def upgrade(connection):
+    # Невалидный индекс после прерванного CREATE INDEX CONCURRENTLY пересоздается
+    connection.execute(text(
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = 'ix_messages_history' AND NOT i.indisvalid) THEN EXECUTE 'DROP INDEX ix_messages_history'; END IF; "
+        "END $$"
+    ))
+    connection.execute(text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_history ON messages (is_deleted, ts, id)"
+    ))
+    connection.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_messages_ts_active"))
@@ -0,0 +1,12 @@
+"""Тип и размер вложений сообщений, определенные при загрузке"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS file_mime VARCHAR",
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS file_size BIGINT",
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
@@ -0,0 +1,23 @@
+"""Полнотекстовый поиск по сообщениям: вычисляемый tsvector и GIN-индекс (создается CONCURRENTLY)"""
+from sqlalchemy import text
+
+from message.model import SEARCH_VECTOR
+
+transactional = False
+
+
+def upgrade(connection):
+    connection.execute(text(
+        "ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED"
+    ))
+    # Невалидный индекс после прерванного CREATE INDEX CONCURRENTLY пересоздается
+    connection.execute(text(
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = 'ix_messages_search' AND NOT i.indisvalid) THEN EXECUTE 'DROP INDEX ix_messages_search'; END IF; "
+        "END $$"
+    ))
+    connection.execute(text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_search ON messages USING gin (search_vector)"
+    ))
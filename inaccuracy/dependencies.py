@@ -0,0 +1,87 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import List
+
+from inaccuracy.rules import AcceptanceRuleEngine, MODES, get_active_profile
+from inaccuracy.schema import InaccuracySettings, Reason, Measure
+
+
+@lru_cache
+def get_inaccuracy_settings() -> InaccuracySettings:
+    """Путь к таблице погрешностей и допуски активного профиля - один раз на процесс"""
+    table_path = Path("inaccuracy/inaccuracytest.xlsx").absolute()
+    table_path.parent.mkdir(parents=True, exist_ok=True)
+    # Допуски по режимам для нормирования погрешностей берутся из активного профиля приемки
+    rules = AcceptanceRuleEngine(get_active_profile())
+    return InaccuracySettings(table_path=table_path, k_max={mode: rules.limit(mode) for mode in MODES})
+
+
+@lru_cache
+def get_reasons() -> List[Reason]:
+    """Справочник причин и мероприятий"""
+    return [
+        Reason(
+            title="Различия в качестве гироскопов",
+            description="Наблюдаются существенные различия в точности и стабильности разных типов гироскопов",
+            measures=[
+                Measure(
+                    title="Провести анализ конструкции",
+                    description="Детальный анализ конструкции гироскопов для выявления слабых мест"
+                ),
+                Measure(
+                    title="Провести анализ технологического производства",
+                    description="Анализ технологического процесса изготовления с целью выявления отклонений"
+                ),
+                Measure(
+                    title="Изучить причины в различии типов",
+                    description="Проведение сравнительных испытаний гироскопов разных типов в одинаковых условиях"
+                ),
+                Measure(
+                    title="Улучшить гироскопы типа А",
+                    description="Модернизация гироскопов определенного типа для повышения их точности"
+                )
+            ]
+        ),
+        Reason(
+            title="Неустойчивая важность",
+            description="Выявлена нестабильность работы изделий в условиях повышенной влажности",
+            measures=[
+                Measure(
+                    title="Использовать влагозащитные покрытия",
+                    description="Применение специальных влагозащитных покрытий для электронных компонентов"
+                ),
+                Measure(
+                    title="Контролировать уровень влажности",
+                    description="Установка строгого контроля уровня влажности в помещениях для испытаний"
+                )
+            ]
+        ),
+        Reason(
+            title="Влияние устаревшего оборудования",
+            description="Обнаружена зависимость погрешности от года выпуска оборудования, указывающая на устаревание",
+            measures=[
+                Measure(
+                    title="Модернизировать устаревшие компоненты",
+                    description="Замена устаревших компонентов на современные аналоги с улучшенными характеристиками"
+                ),
+                Measure(
+                    title="Заменить устаревшее оборудование",
+                    description="Полная замена оборудования, выпущенного ранее определенного года"
+                )
+            ]
+        ),
+        Reason(
+            title="Недостаточность вибрационной нагрузки",
+            description="Выявлено влияние недостаточной вибрационной нагрузки на точность измерений",
+            measures=[
+                Measure(
+                    title="Увеличить вибрационную нагрузку",
+                    description="Увеличение интенсивности вибрационной нагрузки при испытаниях"
+                ),
+                Measure(
+                    title="Улучшить виброизоляцию",
+                    description="Установка улучшенных виброизоляционных платформ в камеры проведения испытаний"
+                )
+            ]
+        )
+    ]
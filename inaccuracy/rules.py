@@ -0,0 +1,167 @@
+"""
+Правила приемки изделий по погрешностям азимута.
+
+Профиль приемки (AcceptanceProfile) задает допуски по режимам, семантику
+any/all и переопределения для типов систем. Один и тот же профиль
+вычисляется двумя способами: SQL-выражением для массового UPDATE
+(проверка статуса изделий) и на массивах NumPy для пробной переоценки
+всей истории без записи в БД.
+
+Кроме встроенного профиля default, профили загружаются из JSON-файла
+settings.acceptance.file (список объектов AcceptanceProfile). Активный
+профиль выбирается settings.acceptance.profile: "имя" - последняя версия,
+"имя:версия" - конкретная. Так проверенный через /acceptance/dry-run
+профиль включается без изменения кода.
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import and_, or_, case, false, func
+
+from core.config.config import settings
+from inaccuracy.schema import AcceptanceProfile, ModeThresholds
+from report_data.model import ReportData
+
+DEFAULT_K_MAX = 3  # Максимальное допустимое значение погрешности по умолчанию
+
+MODES = ("nku", "minus_50", "plus_50")
+
+# Порядок показаний в массиве readings и их индексы для каждого режима
+READING_COLUMNS = (
+    ReportData.azimuth_minus_50, ReportData.repeated_azimuth_minus_50,
+    ReportData.azimuth_nku, ReportData.repeated_azimuth_nku,
+    ReportData.azimuth_plus_50, ReportData.repeated_azimuth_plus_50,
+)
+MODE_READINGS = {
+    "nku": [0, 1, 2, 3, 4, 5],
+    "minus_50": [0, 1, 2, 3],
+    "plus_50": [2, 3, 4, 5],
+}
+
+DEFAULT_PROFILE = AcceptanceProfile(name="default", version=1)
+
+
+@lru_cache
+def load_profiles() -> Dict[Tuple[str, int], AcceptanceProfile]:
+    """Профили приемки по (имя, версия): встроенный и из файла настроек - один раз на процесс"""
+    profiles = {(DEFAULT_PROFILE.name, DEFAULT_PROFILE.version): DEFAULT_PROFILE}
+    if settings.acceptance.file:
+        data = Path(settings.acceptance.file).read_bytes()
+        for profile in TypeAdapter(List[AcceptanceProfile]).validate_json(data):
+            key = (profile.name, profile.version)
+            if key in profiles:
+                raise ValueError(f"Профиль приемки {profile.name} версии {profile.version} задан повторно")
+            profiles[key] = profile
+    return profiles
+
+
+def get_profile(name: str, version: Optional[int] = None) -> AcceptanceProfile:
+    """Профиль по имени и версии; без версии - последняя"""
+    candidates = [
+        profile for (profile_name, profile_version), profile in load_profiles().items()
+        if profile_name == name and (version is None or profile_version == version)
+    ]
+    if not candidates:
+        suffix = f" версии {version}" if version is not None else ""
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Профиль приемки {name}{suffix} не найден")
+    return max(candidates, key=lambda profile: profile.version)
+
+
+def get_active_profile() -> AcceptanceProfile:
+    name, _, version = settings.acceptance.profile.partition(":")
+    return get_profile(name, int(version) if version else None)
+
+
+def compute_errors(readings: np.ndarray) -> np.ndarray:
+    """
+    Погрешности (max - min)/2 по режимам для массива показаний формы (n, 6).
+    Возвращает массив (n, 3) в порядке MODES, NaN - если какого-либо показания нет.
+    """
+    result = np.empty((readings.shape[0], len(MODES)))
+    for i, mode in enumerate(MODES):
+        subset = readings[:, MODE_READINGS[mode]]
+        # max/min распространяют NaN, как и проверка None в _calculate_error
+        result[:, i] = (subset.max(axis=1) - subset.min(axis=1)) / 2
+    return result
+
+
+def error_expressions() -> Dict[str, Any]:
+    """
+    SQL-выражения погрешности по режимам: (max - min)/2, NULL при отсутствии любого показания -
+    то же, что compute_errors и InaccuracyService._calculate_error, но вычисляется в БД
+    """
+    expressions = {}
+    for mode in MODES:
+        columns = [READING_COLUMNS[i] for i in MODE_READINGS[mode]]
+        expressions[mode] = case(
+            (or_(*[column.is_(None) for column in columns]), None),
+            else_=(func.greatest(*columns) - func.least(*columns)) / 2
+        )
+    return expressions
+
+
+class AcceptanceRuleEngine:
+    def __init__(self, profile: AcceptanceProfile):
+        self.profile = profile
+
+    def evaluate(self, system_types: np.ndarray, errors: np.ndarray) -> np.ndarray:
+        """Решения о приемке для пачки: system_types формы (n,), errors формы (n, 3) в порядке MODES"""
+        n = errors.shape[0]
+        thresholds = np.tile(self._threshold_row(self.profile.thresholds), (n, 1))
+        require_all = np.full(n, self.profile.mode == "all")
+        for system_type, override in self.profile.overrides.items():
+            mask = system_types == system_type
+            if not mask.any():
+                continue
+            thresholds[mask] = self._threshold_row(override.thresholds)
+            require_all[mask] = (override.mode or self.profile.mode) == "all"
+
+        considered = ~np.isnan(thresholds)
+        with np.errstate(invalid="ignore"):
+            passed = errors < thresholds  # NaN (нет показаний) - не в допуске
+        any_passed = (passed & considered).any(axis=1)
+        all_passed = (passed | ~considered).all(axis=1) & considered.any(axis=1)
+        return np.where(require_all, all_passed, any_passed)
+
+    def sql_expression(self):
+        """Условие приемки строки reports_data для UPDATE ... SET is_accepted = <выражение>"""
+        errors = error_expressions()
+        default = self._sql_rule(errors, self.profile.thresholds, self.profile.mode)
+        if not self.profile.overrides:
+            return default
+        return case(
+            *[
+                (ReportData.system_type == system_type,
+                 self._sql_rule(errors, override.thresholds, override.mode or self.profile.mode))
+                for system_type, override in self.profile.overrides.items()
+            ],
+            else_=default
+        )
+
+    def limit(self, mode: str) -> float:
+        """Допуск режима в профиле (для нормирования погрешностей в отчетах)"""
+        value = getattr(self.profile.thresholds, mode)
+        return value if value is not None else DEFAULT_K_MAX
+
+    @staticmethod
+    def _threshold_row(thresholds: ModeThresholds) -> np.ndarray:
+        return np.array([
+            np.nan if getattr(thresholds, mode) is None else getattr(thresholds, mode)
+            for mode in MODES
+        ], dtype=float)
+
+    @staticmethod
+    def _sql_rule(errors: dict, thresholds: ModeThresholds, mode: str):
+        conditions = [
+            errors[name] < getattr(thresholds, name)
+            for name in MODES
+            if getattr(thresholds, name) is not None
+        ]
+        if not conditions:
+            return false()
+        combined = and_(*conditions) if mode == "all" else or_(*conditions)
+        return func.coalesce(combined, false())
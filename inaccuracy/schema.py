@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Any, Union
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Union, Literal
 
 class YearlyCountData(BaseModel):
     minus_50: int
@@ -31,6 +32,10 @@ class Reason(BaseModel):
     description: str
     measures: List[Measure]
 
+class InaccuracySettings(BaseModel):
+    table_path: Path
+    k_max: Dict[str, float]
+
 class CorrelationMatrix(BaseModel):
     matrix: Dict[str, Dict[str, Optional[float]]]
     reasons: List[Reason]
@@ -38,4 +43,30 @@ class CorrelationMatrix(BaseModel):
 class ErrorResponse(BaseModel):
     yearly_data: Dict[str, YearlyData]
     correlations: Optional[Dict[str, CorrelationData]] = None
-    correlation_matrix: Optional[CorrelationMatrix] = None
\ No newline at end of file
+    correlation_matrix: Optional[CorrelationMatrix] = None
+
+class ModeThresholds(BaseModel):
+    """Максимально допустимая погрешность по режимам; None - режим не учитывается"""
+    nku: Optional[float] = 3
+    minus_50: Optional[float] = 3
+    plus_50: Optional[float] = 3
+
+class RuleOverride(BaseModel):
+    thresholds: ModeThresholds
+    mode: Optional[Literal["any", "all"]] = None
+
+class AcceptanceProfile(BaseModel):
+    name: str
+    version: int
+    # any - достаточно одной погрешности в допуске, all - все учитываемые погрешности в допуске
+    mode: Literal["any", "all"] = "any"
+    thresholds: ModeThresholds = ModeThresholds()
+    overrides: Dict[str, RuleOverride] = {}  # по типу системы (system_type)
+
+class AcceptanceDryRun(BaseModel):
+    profile: str
+    version: int
+    total: int
+    accepted: int
+    rejected: int
+    changed: int  # решение отличается от сохраненного is_accepted
@@ -1,5 +1,4 @@
 from datetime import datetime
-from pathlib import Path
 from typing import List, Dict, Any, Tuple, Optional
 import math
 import numpy as np
@@ -13,7 +12,8 @@ from openpyxl import load_workbook
 from starlette import status
 from starlette.responses import FileResponse
 
-from inaccuracy.schema import YearlyData, YearlyCountData, ErrorResponse, CorrelationData, CorrelationMatrix, Reason, Measure
+from inaccuracy.schema import YearlyData, YearlyCountData, ErrorResponse, CorrelationData, CorrelationMatrix, Reason, InaccuracySettings
+from inaccuracy.dependencies import get_inaccuracy_settings, get_reasons
 from report_data.repository import ReportDataRepository
 from report_data.model import ReportData
 
@@ -21,84 +21,15 @@ from report_data.model import ReportData
 class InaccuracyService:
     def __init__(
             self,
-            report_data_repo: ReportDataRepository = Depends()
+            report_data_repo: ReportDataRepository = Depends(),
+            config: InaccuracySettings = Depends(get_inaccuracy_settings),
+            reasons: List[Reason] = Depends(get_reasons)
     ):
         self.report_data_repo = report_data_repo
-        self.table_path = Path("inaccuracy/inaccuracytest.xlsx").absolute()
-
-        self.table_path.parent.mkdir(parents=True, exist_ok=True)
-        self.K_MAX = 3  # Максимальное допустимое значение погрешности
-        # Словарь причин и мероприятий
-        self._init_reasons_measures()
-
-    def _init_reasons_measures(self):
-        """Инициализация списка причин и мероприятий"""
-        self.reasons = [
-            Reason(
-                title="Различия в качестве гироскопов",
-                description="Наблюдаются существенные различия в точности и стабильности разных типов гироскопов",
-                measures=[
-                    Measure(
-                        title="Провести анализ конструкции",
-                        description="Детальный анализ конструкции гироскопов для выявления слабых мест"
-                    ),
-                    Measure(
-                        title="Провести анализ технологического производства",
-                        description="Анализ технологического процесса изготовления с целью выявления отклонений"
-                    ),
-                    Measure(
-                        title="Изучить причины в различии типов",
-                        description="Проведение сравнительных испытаний гироскопов разных типов в одинаковых условиях"
-                    ),
-                    Measure(
-                        title="Улучшить гироскопы типа А",
-                        description="Модернизация гироскопов определенного типа для повышения их точности"
-                    )
-                ]
-            ),
-            Reason(
-                title="Неустойчивая важность",
-                description="Выявлена нестабильность работы изделий в условиях повышенной влажности",
-                measures=[
-                    Measure(
-                        title="Использовать влагозащитные покрытия",
-                        description="Применение специальных влагозащитных покрытий для электронных компонентов"
-                    ),
-                    Measure(
-                        title="Контролировать уровень влажности",
-                        description="Установка строгого контроля уровня влажности в помещениях для испытаний"
-                    )
-                ]
-            ),
-            Reason(
-                title="Влияние устаревшего оборудования",
-                description="Обнаружена зависимость погрешности от года выпуска оборудования, указывающая на устаревание",
-                measures=[
-                    Measure(
-                        title="Модернизировать устаревшие компоненты",
-                        description="Замена устаревших компонентов на современные аналоги с улучшенными характеристиками"
-                    ),
-                    Measure(
-                        title="Заменить устаревшее оборудование",
-                        description="Полная замена оборудования, выпущенного ранее определенного года"
-                    )
-                ]
-            ),
-            Reason(
-                title="Недостаточность вибрационной нагрузки",
-                description="Выявлено влияние недостаточной вибрационной нагрузки на точность измерений",
-                measures=[
-                    Measure(
-                        title="Увеличить вибрационную нагрузку",
-                        description="Увеличение интенсивности вибрационной нагрузки при испытаниях"
-                    ),
-                    Measure(
-                        title="Улучшить виброизоляцию",
-                        description="Установка улучшенных виброизоляционных платформ в камеры проведения испытаний"
-                    )
-                ]
-            )
-        ]
+        # Настройки и справочник причин собираются один раз на процесс
+        self.table_path = config.table_path
+        self.k_max = config.k_max
+        self.reasons = reasons
 
     def get_error_data(self) -> ErrorResponse:
         """
@@ -137,7 +68,7 @@ class InaccuracyService:
                 # Рассчитываем μ для каждой температуры
                 if nku_error is not None:
                     try:
-                        mu_nku = float(nku_error) / self.K_MAX
+                        mu_nku = float(nku_error) / self.k_max["nku"]
                         # Проверка на NaN
                         if not math.isnan(mu_nku):
                             yearly_data[year]['nku'].append(mu_nku)
@@ -146,7 +77,7 @@ class InaccuracyService:
 
                 if minus_50_error is not None:
                     try:
-                        mu_minus_50 = float(minus_50_error) / self.K_MAX
+                        mu_minus_50 = float(minus_50_error) / self.k_max["minus_50"]
                         # Проверка на NaN
                         if not math.isnan(mu_minus_50):
                             yearly_data[year]['minus_50'].append(mu_minus_50)
@@ -155,7 +86,7 @@ class InaccuracyService:
 
                 if plus_50_error is not None:
                     try:
-                        mu_plus_50 = float(plus_50_error) / self.K_MAX
+                        mu_plus_50 = float(plus_50_error) / self.k_max["plus_50"]
                         # Проверка на NaN
                         if not math.isnan(mu_plus_50):
                             yearly_data[year]['plus_50'].append(mu_plus_50)
@@ -225,7 +156,7 @@ class InaccuracyService:
     def calculate_errors_for_report(self, report: ReportData) -> dict:
         """Вычисляет погрешности для одного отчета"""
         return {
-            "Год": report.test_date.split(".")[2] if report.test_date else datetime.now().year,
+            "Год": report.year or datetime.now().year,
             "Номер изделия": report.system_number,
             "Погрешность НКУ": self._calculate_error_nku(
                 report.azimuth_minus_50,
@@ -377,9 +308,9 @@ class InaccuracyService:
                     continue
                     
                 # Рассчитываем доли от максимально допустимого
-                dol1 = float(nku_error) / self.K_MAX
-                dol2 = float(minus_50_error) / self.K_MAX
-                dol3 = float(plus_50_error) / self.K_MAX
+                dol1 = float(nku_error) / self.k_max["nku"]
+                dol2 = float(minus_50_error) / self.k_max["minus_50"]
+                dol3 = float(plus_50_error) / self.k_max["plus_50"]
                 
                 # Добавляем данные
                 data['year'].append(int(year_value))
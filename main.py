@@ -1,18 +1,32 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
-from core.config.database import Model, engine
 from core.config.config import settings
 from user.router import router as user_router
 from report.router import router as report_router
-from message.router import router as message_router
+from message.router import router as message_router, deliver_event
+from message.backplane import backplane
+from message.buffer import recent
+from storage import thumbnails
 from inaccuracy.router import router as inaccuracy_router
 from product.router import router as product_router
+from utils.limits import BodySizeLimitMiddleware, MULTIPART_OVERHEAD
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # События чата от всех воркеров доставляются в локальный хаб подключений;
+    # если события могли быть пропущены, буфер истории перечитывается из БД
+    await backplane.start(deliver_event, on_gap=recent.reset)
+    yield
+    await backplane.stop()
+    thumbnails.shutdown()
 
-Model.metadata.create_all(bind=engine)
 
-main_app = FastAPI()
+main_app = FastAPI(lifespan=lifespan)
 
 main_app.include_router(user_router, prefix=settings.api.prefix)
 main_app.include_router(report_router, prefix=settings.api.prefix)
@@ -20,6 +34,8 @@ main_app.include_router(message_router, prefix=settings.api.prefix)
 main_app.include_router(inaccuracy_router, prefix=settings.api.prefix)
 main_app.include_router(product_router, prefix=settings.api.prefix)
 
+# Тело запроса ограничивается до разбора формы: загрузки больше лимита хранилища не читаются целиком
+main_app.add_middleware(BodySizeLimitMiddleware, max_size=settings.storage.limit + MULTIPART_OVERHEAD)
 main_app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -34,5 +50,7 @@ if __name__ == "__main__":
         "main:main_app",
         host=settings.run.host,
         port=settings.run.port,
-        reload=True
+        reload=True,
+        # Сжатие кадров WebSocket (permessage-deflate), если клиент его поддерживает
+        ws_per_message_deflate=True
     )
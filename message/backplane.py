@@ -0,0 +1,162 @@
+"""
+Межпроцессная рассылка событий чата.
+
+Каждый воркер публикует события (новое, измененное, удаленное сообщение)
+в общий канал и получает оттуда все события, включая свои, передавая их
+в локальный хаб подключений. MemoryBackplane - реализация для одного
+процесса, PostgresBackplane - через LISTEN/NOTIFY основной БД.
+"""
+import asyncio
+import json
+from typing import Awaitable, Callable, Optional
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import text
+
+from core.config.config import settings
+from core.config.database import engine
+from .hub import encode
+
+Handler = Callable[[dict], Awaitable[None]]
+GapHandler = Callable[[], None]
+
+CHANNEL = "chat_events"
+NOTIFY_LIMIT = 7900  # байт, предел payload у NOTIFY - 8000
+RECONNECT_DELAY = 1.0  # секунд
+
+
+class Backplane:
+    async def start(self, handler: Handler, on_gap: Optional[GapHandler] = None):
+        """
+        handler получает все события канала; on_gap вызывается, когда события могли быть
+        пропущены (обрыв соединения), чтобы производное от них состояние было сброшено
+        """
+        raise NotImplementedError
+
+    async def stop(self):
+        raise NotImplementedError
+
+    async def publish(self, event: dict):
+        raise NotImplementedError
+
+
+class MemoryBackplane(Backplane):
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler, on_gap: Optional[GapHandler] = None):
+        self._handler = handler
+
+    async def stop(self):
+        self._handler = None
+
+    async def publish(self, event: dict):
+        if self._handler is not None:
+            await self._handler(event)
+
+
+class PostgresBackplane(Backplane):
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self._handler: Optional[Handler] = None
+        self._on_gap: Optional[GapHandler] = None
+        self._connection = None
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._consumer: Optional[asyncio.Task] = None
+        self._reconnect: Optional[asyncio.Task] = None
+        self._stopped = True
+
+    async def start(self, handler: Handler, on_gap: Optional[GapHandler] = None):
+        self._handler = handler
+        self._on_gap = on_gap
+        self._stopped = False
+        # События обрабатываются по одному, в порядке получения
+        self._consumer = asyncio.create_task(self._consume())
+        await self._listen()
+
+    async def stop(self):
+        self._stopped = True
+        for task in (self._reconnect, self._consumer):
+            if task is not None:
+                task.cancel()
+        self._close_listener()
+
+    async def publish(self, event: dict):
+        payload = encode(event)
+        if len(payload.encode()) > NOTIFY_LIMIT:
+            # Крупное сообщение передается ссылкой, получатели читают его из БД
+            payload = encode({"type": event["type"], "ref": event["message"]["id"]})
+        await asyncio.to_thread(self._notify, payload)
+
+    def _notify(self, payload: str):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                               {"channel": self.channel, "payload": payload})
+            connection.commit()
+
+    async def _listen(self):
+        self._connection = await asyncio.to_thread(self._connect)
+        asyncio.get_running_loop().add_reader(self._connection.fileno(), self._on_readable)
+
+    def _connect(self):
+        # Отдельное соединение вне пула: оно держится все время работы воркера
+        connection = psycopg2.connect(**engine.url.translate_connect_args(username="user", database="dbname"))
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _on_readable(self):
+        try:
+            self._connection.poll()
+        except psycopg2.Error as e:
+            print(f"Chat backplane error: {str(e)}")
+            self._close_listener()
+            self._gap()
+            self._reconnect = asyncio.create_task(self._reconnect_loop())
+            return
+        while self._connection.notifies:
+            notify = self._connection.notifies.pop(0)
+            self._events.put_nowait(json.loads(notify.payload))
+
+    def _close_listener(self):
+        if self._connection is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._connection.fileno())
+        except (ValueError, psycopg2.Error):
+            pass
+        self._connection.close()
+        self._connection = None
+
+    async def _reconnect_loop(self):
+        while not self._stopped:
+            await asyncio.sleep(RECONNECT_DELAY)
+            try:
+                await self._listen()
+                # NOTIFY, отправленные пока слушатель был отключен, потеряны
+                self._gap()
+                return
+            except psycopg2.Error as e:
+                print(f"Chat backplane reconnect failed: {str(e)}")
+
+    def _gap(self):
+        if self._on_gap is not None:
+            self._on_gap()
+
+    async def _consume(self):
+        while True:
+            event = await self._events.get()
+            try:
+                await self._handler(event)
+            except Exception as e:
+                print(f"Chat event error: {str(e)}")
+
+
+BACKPLANES = {
+    "memory": MemoryBackplane,
+    "postgres": PostgresBackplane,
+}
+
+backplane: Backplane = BACKPLANES[settings.chat.backplane]()
@@ -0,0 +1,150 @@
+"""
+Кэш последних сообщений чата в памяти процесса.
+
+Хранит до capacity последних сообщений в порядке (ts, id), каждое - уже
+сериализованным в JSON. Обновляется событиями из общего канала (новое,
+измененное, удаленное сообщение, смена профиля автора), поэтому одинаков во всех воркерах.
+Первая страница истории и близкие к ней страницы отдаются без запросов к БД.
+"""
+import asyncio
+import bisect
+import json
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.config.config import settings
+from .hub import encode
+
+Key = Tuple[datetime, int]
+
+
+class RecentMessages:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._keys: List[Key] = []
+        self._encoded: Dict[int, str] = {}
+        self._authors: Dict[int, int] = {}  # id сообщения -> id автора
+        self._lock = asyncio.Lock()
+        self.loaded = False
+        # В буфере все существующие сообщения (более старых в БД нет)
+        self.complete = False
+        # События, пришедшие во время загрузки; применяются после нее
+        self._pending: Optional[List[dict]] = None
+        self._generation = 0
+
+    async def load(self, fetch: Callable[[int], Awaitable[List[dict]]]):
+        """
+        Заполняет буфер последними сообщениями из БД (один раз на процесс, повторно - после reset).
+        События до загрузки не применяются (их сообщения уже в БД), во время загрузки - откладываются.
+        """
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            generation = self._generation
+            self._pending = []
+            try:
+                messages = await fetch(self.capacity)
+            except BaseException:
+                self._pending = None
+                raise
+            if generation != self._generation:
+                # Пока шла загрузка, буфер сброшен: прочитанное может не содержать пропущенных событий
+                return
+            for message in messages:
+                self._store((datetime.fromisoformat(message["ts"]), message["id"]), message)
+            self.complete = len(messages) < self.capacity
+            self.loaded = True
+            pending, self._pending = self._pending, None
+            for event in pending:
+                self.apply(event)
+
+    def reset(self):
+        """Сбрасывает буфер, если события могли быть пропущены; следующий запрос истории загрузит его заново"""
+        self._generation += 1
+        self.loaded = False
+        self.complete = False
+        self._pending = None
+        self._keys = []
+        self._encoded = {}
+        self._authors = {}
+
+    def apply(self, event: dict):
+        """
+        Применяет событие чата: новое сообщение добавляется, измененное заменяется, удаленное убирается;
+        при смене профиля пользователя в его сообщениях обновляются имя и роль автора
+        """
+        if not self.loaded:
+            if self._pending is not None:
+                self._pending.append(event)
+            return
+        if event["type"] == "user_updated":
+            self._update_author(event["user_id"], event["profile"])
+            return
+        message = event.get("message")
+        if message is None:
+            return
+        if event["type"] == "message":
+            self._insert(message)
+        elif event["type"] == "message_edited":
+            if message["id"] in self._encoded:
+                self._encoded[message["id"]] = encode(message)
+        elif event["type"] == "message_deleted":
+            self._remove(message["id"])
+
+    def page(self, limit: int, before: Optional[Key] = None) -> Optional[Tuple[List[str], Optional[Key]]]:
+        """
+        Сериализованные сообщения страницы и ключ для следующей (более старой) страницы
+        или None, если страницу нельзя собрать из буфера.
+        """
+        if not self.loaded:
+            return None
+        end = bisect.bisect_left(self._keys, before) if before is not None else len(self._keys)
+        start = end - limit
+        if start < 0:
+            if not self.complete:
+                return None
+            start = 0
+        keys = self._keys[start:end]
+        next_key = keys[0] if len(keys) == limit else None
+        return [self._encoded[id] for _, id in keys], next_key
+
+    def _insert(self, message: dict):
+        id = message["id"]
+        if id in self._encoded:
+            self._encoded[id] = encode(message)
+            return
+        key = (datetime.fromisoformat(message["ts"]), id)
+        # Сообщение старше буфера не добавляется, иначе в буфере появится разрыв
+        if self._keys and key < self._keys[0] and not self.complete:
+            return
+        self._store(key, message)
+
+    def _store(self, key: Key, message: dict):
+        id = message["id"]
+        bisect.insort(self._keys, key)
+        self._encoded[id] = encode(message)
+        self._authors[id] = message["user_id"]
+        while len(self._keys) > self.capacity:
+            _, oldest = self._keys.pop(0)
+            del self._encoded[oldest]
+            del self._authors[oldest]
+            self.complete = False
+
+    def _remove(self, id: int):
+        if self._encoded.pop(id, None) is None:
+            return
+        del self._authors[id]
+        self._keys = [key for key in self._keys if key[1] != id]
+
+    def _update_author(self, user_id: int, profile: dict):
+        for id, author in self._authors.items():
+            if author == user_id:
+                message = json.loads(self._encoded[id])
+                message["user_name"] = profile["name"]
+                message["user_role"] = profile["role"]
+                self._encoded[id] = encode(message)
+
+
+recent = RecentMessages(settings.chat.buffer)
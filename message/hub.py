@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import Dict, Optional, Set, Union
+
+from fastapi import WebSocket
+from starlette import status
+
+from core.config.config import settings
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+Frame = Union[str, bytes]
+
+
+def encode(message: dict) -> str:
+    """Кадр кодируется в JSON один раз для всех получателей"""
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+def pack(message: dict) -> bytes:
+    return msgpack.packb(message, use_bin_type=True)
+
+
+ENCODERS = {JSON: encode, MSGPACK: pack}
+
+
+def negotiate(websocket: WebSocket) -> Optional[str]:
+    """Подпротокол msgpack, если клиент его предлагает и msgpack установлен; иначе JSON"""
+    if msgpack is not None and MSGPACK in websocket.scope.get("subprotocols", []):
+        return MSGPACK
+    return None
+
+
+class Connection:
+    """Подключение с собственной ограниченной очередью исходящих кадров и задачей-писателем"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, format: str = JSON):
+        self.websocket = websocket
+        self.format = format
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer = asyncio.create_task(self._write())
+
+    def send(self, frame: Frame) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _write(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Сокет уже закрыт, подключение убирает обработчик приема
+            pass
+
+
+class ConnectionManager:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.connections: Dict[WebSocket, Connection] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+    def connect(self, websocket: WebSocket, format: str = JSON) -> Connection:
+        """Регистрирует уже принятое подключение"""
+        connection = Connection(websocket, self.queue_size, format)
+        self.connections[websocket] = connection
+        return connection
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.connections.pop(websocket, None)
+        if connection is not None:
+            connection.writer.cancel()
+
+    def send(self, websocket: WebSocket, message: dict):
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            self._deliver(connection, ENCODERS[connection.format](message))
+
+    def send_text(self, websocket: WebSocket, text: str):
+        """Отправка кадра, уже сериализованного в JSON"""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return
+        if connection.format != JSON:
+            text = ENCODERS[connection.format](json.loads(text))
+        self._deliver(connection, text)
+
+    def broadcast(self, message: dict):
+        """Ставит кадр в очереди всех подключений, не дожидаясь отправки; кодируется один раз на формат"""
+        frames: Dict[str, Frame] = {}
+        for connection in list(self.connections.values()):
+            frame = frames.get(connection.format)
+            if frame is None:
+                frame = frames[connection.format] = ENCODERS[connection.format](message)
+            self._deliver(connection, frame)
+
+    def _deliver(self, connection: Connection, frame: Frame):
+        if not connection.send(frame):
+            # Клиент не успевает читать - отключаем, чтобы не копить для него кадры
+            self.disconnect(connection.websocket)
+            task = asyncio.create_task(self._close(connection.websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+
+
+manager = ConnectionManager(settings.chat.queue)
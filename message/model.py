@@ -1,19 +1,37 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Boolean, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from core.config.database import Model
 from datetime import datetime
 
+SEARCH_CONFIG = "russian"
+# Текст сообщения весомее имени вложения
+SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(file_name, '')), 'B')"
+)
+
 
 class Message(Model):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_history", "is_deleted", "ts", "id"),
+        Index("ix_messages_file_hash", "file_hash"),
+        Index("ix_messages_search", "search_vector", postgresql_using="gin"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
-    ts = Column(DateTime, default=datetime.now())
+    ts = Column(DateTime, default=datetime.now)
     content = Column(String)
     user_id = Column(Integer, ForeignKey("users.id"))
     is_edited = Column(Boolean, default=False)
     edited_at = Column(DateTime, nullable=True)
     file_url = Column(String, nullable=True)
     file_name = Column(String, nullable=True)
+    file_hash = Column(String(64), ForeignKey("blobs.hash"), nullable=True)
+    file_mime = Column(String, nullable=True)
+    file_size = Column(BigInteger, nullable=True)
     is_deleted = Column(Boolean, default=False)
+    # Поисковый вектор вычисляется БД; в обычных выборках не загружается
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR, persisted=True)))
 
     user = relationship("User", foreign_keys=[user_id])
\ No newline at end of file
@@ -1,46 +1,82 @@
-from typing import List, Type, Optional
+from typing import List, Optional, Tuple
 from fastapi.params import Depends
-from sqlalchemy.orm import Session
-from core.config.dependencies import get_db
-from .model import Message
+from sqlalchemy import Row, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config.dependencies import get_async_db
+from .model import Message, SEARCH_CONFIG
 from datetime import datetime
 
 class MessageRepository:
-    def __init__(self, db: Session = Depends(get_db)):
+    """Сообщения читаются и пишутся через асинхронную сессию, не блокируя цикл событий"""
+
+    def __init__(self, db: AsyncSession = Depends(get_async_db)):
         self.db = db
 
-    def create(self, content: str, user_id: int, file_url: Optional[str] = None, file_name: Optional[str] = None) -> Message:
+    async def create(self, content: str, user_id: int, file_url: Optional[str] = None, file_name: Optional[str] = None,
+                     file_hash: Optional[str] = None, file_mime: Optional[str] = None,
+                     file_size: Optional[int] = None) -> Message:
         message = Message(
             content=content,
             user_id=user_id,
             file_url=file_url,
-            file_name=file_name
+            file_name=file_name,
+            file_hash=file_hash,
+            file_mime=file_mime,
+            file_size=file_size
         )
         self.db.add(message)
-        self.db.commit()
-        self.db.refresh(message)
+        await self.db.commit()
         return message
 
-    def get_all_messages(self) -> List[Type[Message]]:
-        return self.db.query(Message).filter(Message.is_deleted == False).order_by(Message.ts).all()
+    async def get_history(self, limit: int, before: Optional[Tuple[datetime, int]] = None) -> List[Message]:
+        """Последние limit сообщений (до курсора before) в хронологическом порядке"""
+        query = select(Message).where(Message.is_deleted == False)
+        if before is not None:
+            query = query.where(tuple_(Message.ts, Message.id) < tuple_(*before))
+        query = query.order_by(Message.ts.desc(), Message.id.desc()).limit(limit)
+        messages = list(await self.db.scalars(query))
+        messages.reverse()
+        return messages
+
+    async def search(self, query: str, limit: int, after: Optional[Tuple[float, int]] = None) -> List[Row]:
+        """
+        Сообщения, подходящие под поисковый запрос (синтаксис websearch), по убыванию релевантности.
+        Возвращает строки (Message, rank); кандидаты отбираются по GIN-индексу ix_messages_search.
+        """
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        rank = func.ts_rank_cd(Message.search_vector, ts_query)
+        stmt = (
+            select(Message, rank.label("rank"))
+            .where(Message.search_vector.op("@@")(ts_query))
+            .where(Message.is_deleted == False)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(rank, Message.id) < tuple_(*after))
+        stmt = stmt.order_by(rank.desc(), Message.id.desc()).limit(limit)
+        return list((await self.db.execute(stmt)).all())
+
+    async def get_message(self, message_id: int) -> Optional[Message]:
+        return await self.db.get(Message, message_id)
 
-    def get_message(self, message_id: int) -> Optional[Message]:
-        return self.db.query(Message).filter(Message.id == message_id).first()
+    async def find_file(self, file_hash: str) -> Optional[Row]:
+        """Исходное имя и тип файла по хешу (file_name, file_mime)"""
+        result = await self.db.execute(
+            select(Message.file_name, Message.file_mime).where(Message.file_hash == file_hash).limit(1)
+        )
+        return result.first()
 
-    def update_message(self, message_id: int, content: str, is_edited: bool, edited_at: datetime) -> Message:
-        message = self.get_message(message_id)
+    async def update_message(self, message_id: int, content: str, is_edited: bool, edited_at: datetime) -> Message:
+        message = await self.get_message(message_id)
         if message:
             message.content = content
             message.is_edited = is_edited
             message.edited_at = edited_at
-            self.db.commit()
-            self.db.refresh(message)
+            await self.db.commit()
         return message
 
-    def delete_message(self, message_id: int) -> Message:
-        message = self.get_message(message_id)
+    async def delete_message(self, message_id: int) -> Message:
+        message = await self.get_message(message_id)
         if message:
             message.is_deleted = True
-            self.db.commit()
-            self.db.refresh(message)
-        return message
\ No newline at end of file
+            await self.db.commit()
+        return message
@@ -1,94 +1,243 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, UploadFile, File, HTTPException, Request
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, UploadFile, File, Form, HTTPException, Request, Query, Response
 from starlette import status
-from typing import List
-from .service import MessageService
-from .schema import MessageResponse, MessageUpdate
+from typing import Optional, Tuple
+from .repository import MessageRepository
+from .service import MessageService, format_message
+from .schema import MessageResponse, MessageUpdate, MessageHistory, MessageSearchResponse, LoadOlderCommand
 from user.service import UserService
-from user.repository import UserRepository
-from fastapi.responses import FileResponse
+from user.repository import AsyncUserRepository
+from user.schema import UserProfile
+from storage.service import StorageService
+from storage import thumbnails
+import json
+import mimetypes
 import os
 from utils.authenticate import get_current_user_ws, check_authenticate
-from pydantic import BaseModel
+from utils.files import file_response
+from .hub import manager, negotiate, msgpack, JSON
+from .buffer import recent
+from .backplane import backplane
+from core.config.database import AsyncSessionLocal
+from pydantic import BaseModel, ValidationError
 
 router = APIRouter(prefix="/api/messages", tags=["messages"])
-active_connections = []
 
-
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
-
-
-manager = ConnectionManager()
+WS_COMMANDS = ("load_older",)
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
     message_service: MessageService = Depends(),
-    user_repo: UserRepository = Depends()
+    user_repo: AsyncUserRepository = Depends()
 ):
+    user = await get_current_user_ws(websocket, user_repo)
+    if not user:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # Клиент может запросить компактный двоичный формат подпротоколом msgpack
+    subprotocol = negotiate(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    # Все исходящие кадры идут через очередь подключения и его задачу-писателя
+    manager.connect(websocket, subprotocol or JSON)
     try:
-        user = await get_current_user_ws(websocket, user_repo)
-        if not user:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
+        # При подключении отправляем только последние сообщения, более старые клиент запрашивает по курсору
+        history = await message_service.get_history_json()
+        manager.send_text(websocket, _history_frame("history", history))
+        await message_service.release()
 
-        await websocket.accept()
-        active_connections.append(websocket)
-        
-        # Отправляем историю сообщений при подключении
-        messages = message_service.get_all_messages()
-        await websocket.send_json({
-            "type": "history", 
-            "messages": [msg.dict() for msg in messages]
-        })
-        
         while True:
-            data = await websocket.receive_text()
-            message = await message_service.send_message(data, user.id)
-            
-            # Отправляем сообщение всем подключенным клиентам
-            for connection in active_connections:
-                await connection.send_json({
-                    "type": "message", 
-                    "message": message.dict()
-                })
-                
+            command, content = await _receive(websocket)
+            if command is not None:
+                await _handle_command(websocket, message_service, command)
+            elif content is not None:
+                message = await message_service.send_message(content, user.id)
+                await publish("message", message)
+            await message_service.release()
+
     except WebSocketDisconnect:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        pass
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
-        if websocket in active_connections:
-            active_connections.remove(websocket)
-        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        try:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        except Exception:
+            pass
+    finally:
+        manager.disconnect(websocket)
+
+async def publish(event_type: str, message: MessageResponse):
+    """Публикует событие чата для подключений всех воркеров"""
+    await backplane.publish({"type": event_type, "message": message.model_dump()})
+
+
+async def deliver_event(event: dict):
+    """Событие из общего канала рассылается подключениям этого воркера"""
+    if "ref" in event:
+        message = await _load_message(event["ref"])
+        if message is None:
+            return
+        event = {"type": event["type"], "message": message.model_dump()}
+    if event["type"] == "user_updated":
+        AsyncUserRepository.remember_profile(event["user_id"], UserProfile(**event["profile"]))
+    recent.apply(event)
+    # Рассылка не ждет медленных клиентов: кадр только ставится в их очереди
+    manager.broadcast(event)
+
+
+async def _load_message(message_id: int) -> Optional[MessageResponse]:
+    async with AsyncSessionLocal() as db:
+        message = await MessageRepository(db).get_message(message_id)
+        if message is None:
+            return None
+        return format_message(message, await AsyncUserRepository(db).get_profile(message.user_id))
+
+
+async def _receive(websocket: WebSocket) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Следующий кадр клиента: (служебный запрос, None) или (None, текст сообщения).
+    Текстовый кадр - текст или JSON-запрос; двоичный - msgpack: запрос, {"content": ...} или строка.
+    """
+    frame = await websocket.receive()
+    if frame["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(frame.get("code", status.WS_1000_NORMAL_CLOSURE))
+    if frame.get("bytes") is None:
+        text = frame.get("text") or ""
+        return _parse_command(text), text
+    if msgpack is None:
+        return None, None
+    try:
+        data = msgpack.unpackb(frame["bytes"], raw=False)
+    except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError):
+        return None, None
+    if isinstance(data, dict):
+        if data.get("type") in WS_COMMANDS:
+            return data, None
+        data = data.get("content")
+    return None, data if isinstance(data, str) else None
+
+
+def _parse_command(data: str) -> Optional[dict]:
+    """Служебный запрос клиента ({"type": "load_older", ...}) или None для обычного сообщения"""
+    if not data.startswith("{"):
+        return None
+    try:
+        command = json.loads(data)
+    except ValueError:
+        return None
+    if isinstance(command, dict) and command.get("type") in WS_COMMANDS:
+        return command
+    return None
+
+
+async def _handle_command(websocket: WebSocket, message_service: MessageService, command: dict):
+    if command["type"] == "load_older":
+        try:
+            request = LoadOlderCommand.model_validate(command)
+        except ValidationError:
+            manager.send(websocket, {"type": "error", "detail": "Некорректный запрос истории"})
+            return
+        try:
+            history = await message_service.get_history_json(limit=request.limit, cursor=request.cursor)
+        except HTTPException as e:
+            manager.send(websocket, {"type": "error", "detail": e.detail})
+            return
+        manager.send_text(websocket, _history_frame("history_older", history))
+
+
+def _history_frame(frame_type: str, history: str) -> str:
+    """Кадр истории из готового JSON страницы, без повторной сериализации сообщений"""
+    return f'{{"type":"{frame_type}",{history[1:]}'
+
+
+
+@router.get("/history", response_model=MessageHistory)
+async def get_history(
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    message_service: MessageService = Depends(),
+    token: dict = Depends(check_authenticate)
+):
+    """
+    Сообщения до курсора (по умолчанию - последние), next_cursor - для следующей, более старой страницы.
+    """
+    return Response(await message_service.get_history_json(limit=limit, cursor=cursor), media_type="application/json")
+
+@router.get("/search", response_model=MessageSearchResponse)
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    message_service: MessageService = Depends(),
+    token: dict = Depends(check_authenticate)
+):
+    """
+    Поиск по тексту сообщений и именам вложений (русская морфология, синтаксис как в веб-поиске:
+    "точная фраза", -исключить, or). Результаты по убыванию релевантности, next_cursor - следующая страница.
+    """
+    return await message_service.search_messages(q, limit=limit, cursor=cursor)
 
 @router.post("/upload", response_model=MessageResponse)
 async def upload_file(
     file: UploadFile = File(...),
+    content: str = Form(""),
     message_service: MessageService = Depends(),
     token: dict = Depends(check_authenticate)
 ):
-    return await message_service.send_message("", token, file)
+    message = await message_service.send_message(content, token, file)
+    await publish("message", message)
+    return message
 
 @router.get("/file/{filename}")
-async def get_file(filename: str):
+async def get_file(
+    filename: str,
+    request: Request,
+    storage: StorageService = Depends(),
+    message_repo: MessageRepository = Depends()
+):
+    file_path = storage.find(filename)
+    if file_path is not None:
+        # Имя файла в хранилище - хеш; тип определен при загрузке, у старых файлов - по исходному имени
+        meta = await message_repo.find_file(filename)
+        media_type = None
+        if meta is not None:
+            media_type = meta.file_mime or (mimetypes.guess_type(meta.file_name)[0] if meta.file_name else None)
+        return file_response(
+            request,
+            file_path,
+            content_hash=filename,
+            content_disposition_type="inline",
+            media_type=media_type or "application/octet-stream",
+        )
+    # Файлы, загруженные до перехода на хранилище по хешу
     file_path = os.path.join("uploads", filename)
-    if not os.path.exists(file_path):
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="Файл не найден")
+    return file_response(request, file_path, content_disposition_type="inline")
+
+@router.get("/file/{filename}/thumbnail")
+async def get_thumbnail(
+    filename: str,
+    request: Request,
+    storage: StorageService = Depends(),
+    message_repo: MessageRepository = Depends()
+):
+    thumbnail = storage.find_thumbnail(filename)
+    if thumbnail is not None:
+        return file_response(
+            request,
+            thumbnail,
+            content_hash=f"{filename}.thumb",
+            content_disposition_type="inline",
+            media_type=thumbnails.THUMBNAIL_MIME,
+        )
+    # Миниатюра еще строится - отдаем оригинал, без долгого кэширования
+    file_path = storage.find(filename)
+    meta = await message_repo.find_file(filename) if file_path is not None else None
+    if meta is None or not thumbnails.supports(meta.file_mime):
         raise HTTPException(status_code=404, detail="Файл не найден")
-    return FileResponse(file_path)
+    return file_response(request, file_path, content_disposition_type="inline", media_type=meta.file_mime)
 
 @router.put("/{message_id}", response_model=MessageResponse)
 async def update_message(
@@ -97,7 +246,9 @@ async def update_message(
     message_service: MessageService = Depends(),
     token: dict = Depends(check_authenticate)
 ):
-    return await message_service.update_message(message_id, token, update_data)
+    message = await message_service.update_message(message_id, token, update_data)
+    await publish("message_edited", message)
+    return message
 
 @router.delete("/{message_id}", response_model=MessageResponse)
 async def delete_message(
@@ -105,4 +256,6 @@ async def delete_message(
     message_service: MessageService = Depends(),
     token: dict = Depends(check_authenticate)
 ):
-    return await message_service.delete_message(message_id, token)
\ No newline at end of file
+    message = await message_service.delete_message(message_id, token)
+    await publish("message_deleted", message)
+    return message
\ No newline at end of file
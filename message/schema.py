@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, StrictInt, StrictStr
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -34,7 +34,31 @@ class MessageResponse(MessageBase):
     edited_at: Optional[str] = None
     file_url: Optional[str] = None
     file_name: Optional[str] = None
+    file_mime: Optional[str] = None
+    file_size: Optional[int] = None
+    thumbnail_url: Optional[str] = None
     is_deleted: bool = False
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class MessageHistory(BaseModel):
+    messages: List[MessageResponse]
+    next_cursor: Optional[str] = None
+
+
+
+class MessageSearchItem(MessageResponse):
+    rank: float
+
+
+class MessageSearchResponse(BaseModel):
+    messages: List[MessageSearchItem]
+    next_cursor: Optional[str] = None
+
+
+class LoadOlderCommand(BaseModel):
+    """Запрос более старой истории по WebSocket: {"type": "load_older", "limit": 50, "cursor": "..."}"""
+    limit: Optional[StrictInt] = Field(None, ge=1)
+    cursor: Optional[StrictStr] = None
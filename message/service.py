@@ -1,92 +1,179 @@
+import json
 from typing import List, Optional, Union
 from fastapi import Depends, HTTPException
+from .buffer import recent
+from .hub import encode
 from .repository import MessageRepository
-from .schema import MessageResponse, MessageUpdate
-from user.repository import UserRepository
+from .schema import MessageResponse, MessageUpdate, MessageHistory, MessageSearchItem, MessageSearchResponse
+from core.config.config import settings
+from utils.pagination import encode_cursor, decode_cursor, encode_rank_cursor, decode_rank_cursor
+from storage.repository import AsyncBlobRepository
+from storage.service import StorageService
+from storage import thumbnails
+from user.repository import AsyncUserRepository
+from user.schema import UserProfile
 from datetime import datetime
-import os
 from fastapi import UploadFile
-import aiofiles
-import uuid
 
 class MessageService:
     def __init__(self,
                  message_repo: MessageRepository = Depends(),
-                 user_repo: UserRepository = Depends()):
+                 user_repo: AsyncUserRepository = Depends(),
+                 blob_repo: AsyncBlobRepository = Depends(),
+                 storage: StorageService = Depends()):
         self.message_repo = message_repo
         self.user_repo = user_repo
-        self.upload_dir = "uploads"
+        self.blob_repo = blob_repo
+        self.storage = storage
 
-    def _get_user_id(self, token: dict) -> int:
+    async def _get_user_id(self, token: dict) -> int:
         username = token.get("sub")
-        user = self.user_repo.find_by_login(username)
+        user = await self.user_repo.find_by_login(username)
         if not user:
             raise HTTPException(status_code=404, detail="Пользователь не найден")
         return user.id
 
     async def send_message(self, content: str, token_or_id: Union[dict, int], file: Optional[UploadFile] = None) -> MessageResponse:
-        user_id = self._get_user_id(token_or_id) if isinstance(token_or_id, dict) else token_or_id
+        user_id = await self._get_user_id(token_or_id) if isinstance(token_or_id, dict) else token_or_id
         file_url = None
         file_name = None
-        
+        blob = None
+
         if file:
-            file_name = f"{uuid.uuid4()}_{file.filename}"
-            file_path = os.path.join(self.upload_dir, file_name)
-            os.makedirs(self.upload_dir, exist_ok=True)
-
-            async with aiofiles.open(file_path, 'wb') as out_file:
-                content = await file.read()
-                await out_file.write(content)
-            
-            file_url = f"/uploads/{file_name}"
+            # Файл пишется в хранилище блоками, с ограничением размера
+            blob = await self.storage.save_upload(file)
+            file_url = f"/uploads/{blob.hash}"
             file_name = file.filename
 
-        db_message = self.message_repo.create("", user_id, file_url, file_name)
-        return self._format_message_response(db_message)
+        try:
+            if blob:
+                # Ссылка на файл учитывается в той же транзакции, что и сообщение
+                await self.blob_repo.acquire(blob.hash, blob.size)
+            db_message = await self.message_repo.create(
+                content, user_id, file_url, file_name,
+                file_hash=blob.hash if blob else None,
+                file_mime=blob.mime if blob else None,
+                file_size=blob.size if blob else None
+            )
+        except Exception:
+            await self.message_repo.db.rollback()
+            raise
+        if blob:
+            # Миниатюра строится в фоне, клиент получает ее адрес сразу
+            thumbnails.schedule(blob.path, blob.mime)
+        return await self._format_message_response(db_message)
+
+    async def get_history(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> MessageHistory:
+        """Страница истории: последние limit сообщений до курсора, next_cursor - для более старых"""
+        limit = max(1, min(limit or settings.chat.history, settings.chat.limit))
+        before = decode_cursor(cursor) if cursor else None
+        messages = await self.message_repo.get_history(limit, before)
+        next_cursor = None
+        if len(messages) == limit:
+            next_cursor = encode_cursor(messages[0].ts, messages[0].id)
+        # Авторы всей страницы - из кэша профилей или одним запросом
+        profiles = await self.user_repo.get_profiles(msg.user_id for msg in messages)
+        return MessageHistory(
+            messages=[format_message(msg, profiles[msg.user_id]) for msg in messages],
+            next_cursor=next_cursor
+        )
+
+    async def get_history_json(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> str:
+        """
+        Страница истории в JSON ({"messages": [...], "next_cursor": ...}).
+        Собирается из буфера последних сообщений без запросов к БД, если он покрывает страницу.
+        """
+        limit = max(1, min(limit or settings.chat.history, settings.chat.limit))
+        before = decode_cursor(cursor) if cursor else None
+        await recent.load(self._fetch_recent)
+        page = recent.page(limit, before)
+        if page is None:
+            history = await self.get_history(limit, cursor)
+            return encode(history.model_dump())
+        messages, next_key = page
+        next_cursor = encode_cursor(*next_key) if next_key else None
+        return f'{{"messages":[{",".join(messages)}],"next_cursor":{json.dumps(next_cursor)}}}'
+
+    async def _fetch_recent(self, count: int) -> List[dict]:
+        messages = await self.message_repo.get_history(count)
+        profiles = await self.user_repo.get_profiles(msg.user_id for msg in messages)
+        return [format_message(msg, profiles[msg.user_id]).model_dump() for msg in messages]
 
-    def get_all_messages(self) -> List[MessageResponse]:
-        messages = self.message_repo.get_all_messages()
-        return [self._format_message_response(msg) for msg in messages]
+    async def search_messages(self, query: str, limit: Optional[int] = None,
+                              cursor: Optional[str] = None) -> MessageSearchResponse:
+        """Полнотекстовый поиск по тексту сообщений и именам вложений, страницами по релевантности"""
+        query = query.strip()
+        if not query:
+            raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+        limit = max(1, min(limit or settings.chat.history, settings.chat.limit))
+        after = decode_rank_cursor(cursor) if cursor else None
+        rows = await self.message_repo.search(query, limit, after)
+        next_cursor = None
+        if len(rows) == limit:
+            last_message, last_rank = rows[-1]
+            next_cursor = encode_rank_cursor(last_rank, last_message.id)
+        profiles = await self.user_repo.get_profiles(msg.user_id for msg, _ in rows)
+        return MessageSearchResponse(
+            messages=[
+                MessageSearchItem(**format_message(msg, profiles[msg.user_id]).model_dump(), rank=rank)
+                for msg, rank in rows
+            ],
+            next_cursor=next_cursor
+        )
+
+    async def get_message(self, message_id: int) -> Optional[MessageResponse]:
+        message = await self.message_repo.get_message(message_id)
+        return await self._format_message_response(message) if message else None
 
     async def update_message(self, message_id: int, token: dict, update_data: MessageUpdate) -> MessageResponse:
-        user_id = self._get_user_id(token)
-        message = self.message_repo.get_message(message_id)
+        user_id = await self._get_user_id(token)
+        message = await self.message_repo.get_message(message_id)
         if not message:
             raise HTTPException(status_code=404, detail="Сообщение не найдено")
         if message.user_id != user_id:
             raise HTTPException(status_code=403, detail="Нет прав на редактирование этого сообщения")
         
-        updated_message = self.message_repo.update_message(
+        updated_message = await self.message_repo.update_message(
             message_id=message_id,
             content=update_data.content,
             is_edited=True,
             edited_at=datetime.now()
         )
-        return self._format_message_response(updated_message)
+        return await self._format_message_response(updated_message)
 
     async def delete_message(self, message_id: int, token: dict) -> MessageResponse:
-        user_id = self._get_user_id(token)
-        message = self.message_repo.get_message(message_id)
+        user_id = await self._get_user_id(token)
+        message = await self.message_repo.get_message(message_id)
         if not message:
             raise HTTPException(status_code=404, detail="Сообщение не найдено")
         if message.user_id != user_id:
             raise HTTPException(status_code=403, detail="Нет прав на удаление этого сообщения")
         
-        deleted_message = self.message_repo.delete_message(message_id)
-        return self._format_message_response(deleted_message)
-
-    def _format_message_response(self, db_message) -> MessageResponse:
-        user = self.user_repo.find(db_message.user_id)
-        return MessageResponse(
-            id=db_message.id,
-            content=db_message.content,
-            user_id=db_message.user_id,
-            ts=db_message.ts.isoformat(),
-            user_name=f"{user.fname} {user.lname}",
-            user_role=user.role.value,
-            is_edited=db_message.is_edited,
-            edited_at=db_message.edited_at.isoformat() if db_message.edited_at else None,
-            file_url=db_message.file_url,
-            file_name=db_message.file_name,
-            is_deleted=db_message.is_deleted
-        )
\ No newline at end of file
+        deleted_message = await self.message_repo.delete_message(message_id)
+        return await self._format_message_response(deleted_message)
+
+    async def release(self):
+        """Возвращает соединение в пул между кадрами долгоживущего WebSocket-подключения"""
+        await self.message_repo.db.close()
+
+    async def _format_message_response(self, db_message) -> MessageResponse:
+        return format_message(db_message, await self.user_repo.get_profile(db_message.user_id))
+
+
+def format_message(db_message, profile: UserProfile) -> MessageResponse:
+    return MessageResponse(
+        id=db_message.id,
+        content=db_message.content,
+        user_id=db_message.user_id,
+        ts=db_message.ts.isoformat(),
+        user_name=profile.name,
+        user_role=profile.role,
+        is_edited=db_message.is_edited,
+        edited_at=db_message.edited_at.isoformat() if db_message.edited_at else None,
+        file_url=db_message.file_url,
+        file_name=db_message.file_name,
+        file_mime=db_message.file_mime,
+        file_size=db_message.file_size,
+        thumbnail_url=f"{db_message.file_url}/thumbnail" if thumbnails.supports(db_message.file_mime) else None,
+        is_deleted=db_message.is_deleted
+    )
@@ -9,7 +9,7 @@ class Product(Model):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     is_accepted = Column(Boolean, default=False)
-    report_number = Column(Integer, ForeignKey("reports.number"), nullable=True)
+    report_number = Column(Integer, ForeignKey("reports.number"), nullable=True, index=True)
 
     # Relationship to Report
     report = relationship("Report", foreign_keys=[report_number], backref="products")
\ No newline at end of file
@@ -1,5 +1,7 @@
-from typing import List, Type, Optional
+from typing import Dict, List, Type, Optional
 from fastapi import Depends
+from sqlalchemy import insert, update, func, bindparam, Boolean, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 
 from core.config.dependencies import get_db
@@ -22,6 +24,15 @@ class ProductRepository:
         self.db.refresh(db_product)
         return db_product
 
+    def create_many(self, products: List[ProductCreate]) -> List[Product]:
+        """Вставка пачки изделий одним INSERT ... RETURNING, порядок строк как в products. Без commit"""
+        if not products:
+            return []
+        return list(self.db.scalars(
+            insert(Product).returning(Product, sort_by_parameter_order=True),
+            [product.model_dump() for product in products]
+        ))
+
     def delete(self, product_id: int):
         self.db.query(Product).filter(Product.id == product_id).delete()
         self.db.commit()
@@ -29,11 +40,8 @@ class ProductRepository:
     def find_by_id(self, product_id: int) -> Optional[Product]:
         return self.db.query(Product).filter(Product.id == product_id).first()
 
-    def find_accepted(self) -> List[Type[Product]]:
-        return self.db.query(Product).filter(Product.is_accepted == True).all()
-
-    def find_rejected(self) -> List[Type[Product]]:
-        return self.db.query(Product).filter(Product.is_accepted == False).all()
+    def find_all_by_status(self) -> List[Type[Product]]:
+        return self.db.query(Product).order_by(Product.is_accepted.desc().nulls_last(), Product.id).all()
 
     def find_by_report_number(self, report_number: int) -> List[Type[Product]]:
         return self.db.query(Product).filter(Product.report_number == report_number).all()
@@ -44,4 +52,24 @@ class ProductRepository:
             product.is_accepted = is_accepted
             self.db.commit()
             self.db.refresh(product)
-        return product
\ No newline at end of file
+        return product
+
+    def update_status_many(self, statuses: Dict[int, bool]) -> List[Product]:
+        """
+        Обновление статуса пачки изделий одним UPDATE ... FROM unnest(ids, flags).
+        Возвращает обновленные изделия (отсутствующие id просто не попадают в результат). Без commit
+        """
+        if not statuses:
+            return []
+        values = func.unnest(
+            bindparam("ids", list(statuses.keys()), type_=ARRAY(Integer)),
+            bindparam("flags", list(statuses.values()), type_=ARRAY(Boolean)),
+        ).table_valued("id", "is_accepted").render_derived()
+        query = (
+            update(Product)
+            .where(Product.id == values.c.id)
+            .values(is_accepted=values.c.is_accepted)
+            .returning(Product)
+            .execution_options(synchronize_session=False)
+        )
+        return list(self.db.scalars(query))
\ No newline at end of file
@@ -1,8 +1,12 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, Body, HTTPException, status
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
 
-from .schema import ProductCreate, ProductResponse, ProductList
+from .schema import (
+    ProductCreate, ProductResponse, ProductList,
+    ProductBatchCreate, ProductBatchStatusUpdate, ProductBatchResult
+)
+from inaccuracy.schema import AcceptanceProfile, AcceptanceDryRun
 from .service import ProductService
 from utils.authenticate import check_authenticate
 
@@ -18,6 +22,30 @@ def create_product(
     return product_service.create_product(product)
 
 
+@router.post("/batch", response_model=ProductBatchResult)
+def create_products(
+        batch: ProductBatchCreate,
+        product_service: ProductService = Depends(),
+        token: dict = Depends(check_authenticate),
+) -> ProductBatchResult:
+    """
+    Создает пачку изделий одной транзакцией, результат - по каждому элементу.
+    """
+    return product_service.create_products(batch)
+
+
+@router.put("/batch/status", response_model=ProductBatchResult)
+def update_products_status(
+        batch: ProductBatchStatusUpdate,
+        product_service: ProductService = Depends(),
+        token: dict = Depends(check_authenticate),
+) -> ProductBatchResult:
+    """
+    Обновляет статус пачки изделий одним запросом, результат - по каждому элементу.
+    """
+    return product_service.update_products_status(batch)
+
+
 @router.get("/", response_model=ProductList)
 def get_products(
         product_service: ProductService = Depends(),
@@ -56,11 +84,40 @@ async def check_products_status(
     return product_service.check_and_update_products_status()
 
 
-@router.get("/status", response_model=Dict[str, List[Dict[str, Any]]])
-async def get_products_status(
+@router.get("/acceptance/profiles", response_model=List[AcceptanceProfile])
+def get_acceptance_profiles(
+        product_service: ProductService = Depends(),
+        token: dict = Depends(check_authenticate),
+) -> List[AcceptanceProfile]:
+    """
+    Список профилей приемки.
+    """
+    return product_service.list_acceptance_profiles()
+
+
+@router.post("/acceptance/dry-run", response_model=AcceptanceDryRun)
+def dry_run_acceptance(
+        profile: AcceptanceProfile,
+        product_service: ProductService = Depends(),
+        token: dict = Depends(check_authenticate),
+) -> AcceptanceDryRun:
+    """
+    Переоценивает всю историю по профилю-кандидату без записи в БД.
+    """
+    return product_service.dry_run_acceptance(profile)
+
+
+@router.get("/status", response_class=StreamingResponse)
+def get_products_status(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     product_service: ProductService = Depends()
-) -> Dict[str, List[Dict[str, Any]]]:
+) -> StreamingResponse:
     """
-    Получает список принятых и непринятых изделий.
+    Получает список принятых и непринятых изделий (потоковый JSON).
+    limit и cursor задают страницу по обеим группам; курсор следующей страницы - в next_cursor.
     """
-    return product_service.get_products_status()
\ No newline at end of file
+    return StreamingResponse(
+        product_service.stream_products_status(limit=limit, cursor=cursor),
+        media_type="application/json"
+    )
\ No newline at end of file
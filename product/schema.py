@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
 
@@ -8,11 +8,8 @@ class ProductBase(BaseModel):
     report_number: Optional[int] = None
 
 
-class ProductCreate(BaseModel):
-    report_number: str
-    system_number: str
-    system_type: str
-    department: str
+class ProductCreate(ProductBase):
+    pass
 
 
 class Product(ProductBase):
@@ -26,18 +23,43 @@ class Product(ProductBase):
         return cls(**kwargs)
 
 
-class ProductResponse(BaseModel):
+class ProductResponse(ProductBase):
     id: int
-    report_number: str
-    system_number: str
-    system_type: str
-    department: str
+
+    class Config:
+        from_attributes = True
 
 
 class ProductList(BaseModel):
     products: List[ProductResponse]
 
 
+class ProductStatusUpdate(BaseModel):
+    id: int
+    is_accepted: bool
+
+
+class ProductBatchCreate(BaseModel):
+    products: List[ProductCreate] = Field(..., max_length=5000)
+
+
+class ProductBatchStatusUpdate(BaseModel):
+    items: List[ProductStatusUpdate] = Field(..., max_length=5000)
+
+
+class ProductBatchItem(BaseModel):
+    index: int
+    status: int
+    product: Optional[ProductResponse] = None
+    detail: Optional[str] = None
+
+
+class ProductBatchResult(BaseModel):
+    succeeded: int
+    failed: int
+    items: List[ProductBatchItem]
+
+
 class ProductStatusResponse(BaseModel):
     total_checked: int
     accepted: int
@@ -1,12 +1,21 @@
-from typing import List, Dict, Any
+import json
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import numpy as np
 from fastapi import Depends, HTTPException, status
 
+from core.config.database import SessionLocal
+from utils.pagination import encode_flag_cursor, decode_flag_cursor
 from .repository import ProductRepository
-from .schema import ProductCreate, ProductResponse, ProductList
+from .schema import (
+    ProductCreate, ProductResponse, ProductList,
+    ProductBatchCreate, ProductBatchStatusUpdate, ProductBatchItem, ProductBatchResult
+)
 from report.repository import ReportRepository
 from report_data.repository import ReportDataRepository
 from report_data.model import ReportData
-from inaccuracy.service import InaccuracyService
+from inaccuracy.rules import AcceptanceRuleEngine, READING_COLUMNS, compute_errors, get_active_profile, load_profiles
+from inaccuracy.schema import AcceptanceProfile, AcceptanceDryRun
 
 
 class ProductService:
@@ -14,14 +23,11 @@ class ProductService:
             self,
             product_repo: ProductRepository = Depends(),
             report_repo: ReportRepository = Depends(),
-            report_data_repo: ReportDataRepository = Depends(),
-            inaccuracy_service: InaccuracyService = Depends()
+            report_data_repo: ReportDataRepository = Depends()
     ):
         self.product_repo = product_repo
         self.report_repo = report_repo
         self.report_data_repo = report_data_repo
-        self.inaccuracy_service = inaccuracy_service
-        self.K_MAX = 3  # Максимальное допустимое значение погрешности
 
     def create_product(self, product: ProductCreate) -> ProductResponse:
         """
@@ -53,21 +59,107 @@ class ProductService:
                 detail=f"Ошибка при создании продукта: {str(e)}"
             )
 
-    def get_products(self) -> ProductList:
+    def create_products(self, batch: ProductBatchCreate) -> ProductBatchResult:
         """
-        Gets all products grouped by acceptance status
+        Creates a batch of products in one transaction
+
+        Report numbers are validated with one query, valid products are inserted
+        with one statement. Items with unknown reports are reported per item.
+
+        Args:
+            batch (ProductBatchCreate): Products to create
 
         Returns:
-            ProductList: Object with accepted and rejected products
+            ProductBatchResult: Per-item results in request order
         """
         try:
-            accepted_products = self.product_repo.find_accepted()
-            rejected_products = self.product_repo.find_rejected()
+            known = self.report_repo.existing_numbers(
+                p.report_number for p in batch.products if p.report_number is not None
+            )
+            items: List[ProductBatchItem] = []
+            valid: List[Tuple[int, ProductCreate]] = []
+            for index, product in enumerate(batch.products):
+                if product.report_number is not None and product.report_number not in known:
+                    items.append(ProductBatchItem(
+                        index=index,
+                        status=status.HTTP_404_NOT_FOUND,
+                        detail=f"Отчет с номером {product.report_number} не найден"
+                    ))
+                else:
+                    valid.append((index, product))
+
+            created = self.product_repo.create_many([product for _, product in valid])
+            # Ответы собираются до commit, чтобы не перечитывать каждую строку после expire
+            for (index, _), db_product in zip(valid, created):
+                items.append(ProductBatchItem(
+                    index=index,
+                    status=status.HTTP_201_CREATED,
+                    product=self._format_product_response(db_product)
+                ))
+            self.product_repo.db.commit()
+            return self._batch_result(items)
+        except Exception as e:
+            self.product_repo.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Ошибка при создании продуктов: {str(e)}"
+            )
+
+    def update_products_status(self, batch: ProductBatchStatusUpdate) -> ProductBatchResult:
+        """
+        Updates the acceptance status of a batch of products with one UPDATE
 
-            return ProductList(
-                accepted=[self._format_product_response(p) for p in accepted_products],
-                rejected=[self._format_product_response(p) for p in rejected_products]
+        Args:
+            batch (ProductBatchStatusUpdate): Product ids with new statuses
+
+        Returns:
+            ProductBatchResult: Per-item results in request order
+        """
+        try:
+            # При повторе id в запросе применяется последнее значение
+            statuses = {item.id: item.is_accepted for item in batch.items}
+            updated = {p.id: p for p in self.product_repo.update_status_many(statuses)}
+
+            items = []
+            for index, item in enumerate(batch.items):
+                product = updated.get(item.id)
+                if product is None:
+                    items.append(ProductBatchItem(
+                        index=index,
+                        status=status.HTTP_404_NOT_FOUND,
+                        detail=f"Продукт с ID {item.id} не найден"
+                    ))
+                else:
+                    items.append(ProductBatchItem(
+                        index=index,
+                        status=status.HTTP_200_OK,
+                        product=self._format_product_response(product)
+                    ))
+            self.product_repo.db.commit()
+            return self._batch_result(items)
+        except Exception as e:
+            self.product_repo.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Ошибка при обновлении статуса продуктов: {str(e)}"
             )
+
+    @staticmethod
+    def _batch_result(items: List[ProductBatchItem]) -> ProductBatchResult:
+        items.sort(key=lambda item: item.index)
+        failed = sum(1 for item in items if item.status >= 400)
+        return ProductBatchResult(succeeded=len(items) - failed, failed=failed, items=items)
+
+    def get_products(self) -> ProductList:
+        """
+        Gets all products ordered by acceptance status (one query)
+
+        Returns:
+            ProductList: Accepted products first, then rejected and unchecked
+        """
+        try:
+            products = self.product_repo.find_all_by_status()
+            return ProductList(products=[self._format_product_response(p) for p in products])
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -137,52 +229,13 @@ class ProductService:
         Возвращает словарь с количеством обновленных изделий.
         """
         try:
-            # Получаем все изделия, которые еще не были проверены (is_accepted is None)
-            unverified_products = self.report_data_repo.db.query(ReportData)\
-                .filter(ReportData.is_accepted.is_(None))\
-                .all()
-
-            if not unverified_products:
-                return {
-                    "total_checked": 0,
-                    "accepted": 0,
-                    "rejected": 0
-                }
-
-            accepted_count = 0
-            rejected_count = 0
-
-            for product in unverified_products:
-                # Рассчитываем погрешности для изделия
-                error_data = self.inaccuracy_service.calculate_errors_for_report(product)
-                
-                # Получаем значения погрешностей
-                nku_error = error_data["Погрешность НКУ"]
-                minus_50_error = error_data["Погрешность -50"]
-                plus_50_error = error_data["Погрешность +50"]
-
-                # Проверяем, есть ли хотя бы одна погрешность меньше допустимого значения
-                is_accepted = False
-                if nku_error is not None and nku_error < self.K_MAX:
-                    is_accepted = True
-                elif minus_50_error is not None and minus_50_error < self.K_MAX:
-                    is_accepted = True
-                elif plus_50_error is not None and plus_50_error < self.K_MAX:
-                    is_accepted = True
-
-                # Обновляем статус изделия
-                product.is_accepted = is_accepted
-                
-                if is_accepted:
-                    accepted_count += 1
-                else:
-                    rejected_count += 1
-
-            # Сохраняем изменения в базе данных
+            # Решение по активному профилю приемки вычисляется в БД одним UPDATE
+            is_accepted = AcceptanceRuleEngine(get_active_profile()).sql_expression()
+            accepted_count, rejected_count = self.report_data_repo.evaluate_acceptance(is_accepted)
             self.report_data_repo.db.commit()
 
             return {
-                "total_checked": len(unverified_products),
+                "total_checked": accepted_count + rejected_count,
                 "accepted": accepted_count,
                 "rejected": rejected_count
             }
@@ -194,39 +247,91 @@ class ProductService:
                 detail=f"Ошибка при проверке статуса изделий: {str(e)}"
             )
 
-    def get_products_status(self) -> Dict[str, List[Dict[str, Any]]]:
+    def list_acceptance_profiles(self) -> List[AcceptanceProfile]:
+        return list(load_profiles().values())
+
+    def dry_run_acceptance(self, profile: AcceptanceProfile) -> AcceptanceDryRun:
         """
-        Получает список принятых и непринятых изделий
+        Переоценивает всю историю по профилю-кандидату без записи в БД:
+        показания читаются пачками и оцениваются векторно на NumPy
         """
+        rules = AcceptanceRuleEngine(profile)
+        total = accepted = changed = 0
         try:
-            accepted_products = self.report_data_repo.db.query(ReportData)\
-                .filter(ReportData.is_accepted == True)\
-                .all()
-
-            rejected_products = self.report_data_repo.db.query(ReportData)\
-                .filter(ReportData.is_accepted == False)\
-                .all()
-
-            def format_product(product):
-                return {
-                    "id": product.id,
-                    "system_number": product.system_number,
-                    "system_type": product.system_type,
-                    "department": product.department,
-                    "test_date": product.test_date
-                }
-
-            return {
-                "accepted": [format_product(p) for p in accepted_products],
-                "rejected": [format_product(p) for p in rejected_products]
-            }
-
+            for rows in self.report_data_repo.stream_columns(
+                    ReportData.system_type, ReportData.is_accepted, *READING_COLUMNS):
+                system_types = np.array([row[0] for row in rows], dtype=object)
+                current = np.array([row[1] for row in rows], dtype=object)
+                readings = np.array([row[2:] for row in rows], dtype=float)  # None -> NaN
+
+                decisions = rules.evaluate(system_types, compute_errors(readings))
+                total += len(rows)
+                accepted += int(np.count_nonzero(decisions))
+                changed += int(np.count_nonzero(current != decisions))
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Ошибка при получении статуса изделий: {str(e)}"
+                detail=f"Ошибка при пробной оценке профиля приемки: {str(e)}"
             )
 
+        return AcceptanceDryRun(
+            profile=profile.name,
+            version=profile.version,
+            total=total,
+            accepted=accepted,
+            rejected=total - accepted,
+            changed=changed
+        )
+
+    def stream_products_status(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Iterator[str]:
+        """
+        Список принятых и непринятых изделий одним запросом, отдается потоком JSON:
+        {"accepted": [...], "rejected": [...], "next_cursor": ...}.
+        limit и cursor задают страницу по обеим группам сразу.
+        """
+        after = decode_flag_cursor(cursor) if cursor else None
+        return self._generate_products_status(limit, after)
+
+    @staticmethod
+    def _generate_products_status(limit: Optional[int], after: Optional[Tuple[bool, int]]) -> Iterator[str]:
+        # Ответ пишется после выхода из зависимостей запроса, поэтому у генератора своя сессия
+        db = SessionLocal()
+        try:
+            result = ReportDataRepository(db).stream_status(limit=limit, after=after)
+            yield '{"accepted":['
+            in_accepted = True
+            first = True
+            count = 0
+            last = None
+            for rows in result.partitions():
+                parts = []
+                for row in rows:
+                    if in_accepted and not row.is_accepted:
+                        parts.append('],"rejected":[')
+                        in_accepted = False
+                        first = True
+                    if not first:
+                        parts.append(",")
+                    parts.append(json.dumps({
+                        "id": row.id,
+                        "system_number": row.system_number,
+                        "system_type": row.system_type,
+                        "department": row.department,
+                        "test_date": row.test_date
+                    }, ensure_ascii=False))
+                    first = False
+                count += len(rows)
+                last = rows[-1]
+                yield "".join(parts)
+            if in_accepted:
+                yield '],"rejected":['
+            next_cursor = None
+            if limit is not None and count == limit and last is not None:
+                next_cursor = encode_flag_cursor(last.is_accepted, last.id)
+            yield f'],"next_cursor":{json.dumps(next_cursor)}}}'
+        finally:
+            db.close()
+
     def _format_product_response(self, product) -> ProductResponse:
         """
         Форматирует модель продукта в ответ API
@@ -0,0 +1,438 @@
+"""
+Офлайн-загрузка архива отчетов без HTTP и JWT.
+
+Пример запуска:
+    python -m report.ingest /data/archive --login admin --workers 8
+    python -m report.ingest --reextract    # после увеличения PARSER_VERSION
+    python -m report.ingest --backfill-dates
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update, func, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config.database import SessionLocal
+from report.model import Report
+from report_data.model import ReportData
+from report_data.repository import ReportDataRepository, ParseCacheRepository
+from report_data.schema import ReportDataCreate
+from report_data.service import ReportDataService, PARSER_VERSION, extract_report_fields, build_report_data
+from storage.repository import BlobRepository
+from storage.service import StorageService, CHUNK_SIZE
+from user.repository import UserRepository
+
+NUMBER_PATTERN = re.compile(r"\d+")
+# Поля данных отчета, которые берутся из файла; при их изменении проверка и расчет повторяются
+READINGS = [field for field in ReportDataCreate.model_fields if field not in ("report_id", "calculated", "parser_version")]
+
+
+def _parse(path: str) -> Tuple[str, Optional[dict], Optional[str]]:
+    """Выполняется в процессе пула: разбирает один файл"""
+    try:
+        return path, extract_report_fields(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _hash_file(path: str) -> Tuple[str, str]:
+    """Выполняется в процессе пула: хеш содержимого файла (ключ кэша разбора)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return path, digest.hexdigest()
+
+
+def _chunksize(workers: int, count: int) -> int:
+    return max(1, count // (workers * 4))
+
+
+def _report_number(path: str, data: dict) -> Optional[int]:
+    """
+    Номер отчета: номер системы, если он есть в имени файла; единственное число в имени файла;
+    номер системы, если в имени чисел нет. Несколько чисел без номера системы среди них
+    (например, год или дата в имени) - номер неоднозначен, None
+    """
+    numbers = [int(match) for match in NUMBER_PATTERN.findall(Path(path).stem)]
+    system_number = data.get("system_number")
+    if system_number in numbers or not numbers:
+        return system_number
+    if len(numbers) == 1:
+        return numbers[0]
+    return None
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Checkpoint:
+    """Журнал уже загруженных файлов, позволяет продолжить прерванный запуск"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done = set()
+        if path.exists():
+            self.done = {line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()}
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.done
+
+    def mark(self, items: List[str]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(item + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(items)
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.found = 0
+        self.skipped = 0
+        self.written = 0
+        self.duplicates = 0
+        self.conflicts = 0
+        self.cache_hits = 0
+        self.failed = 0
+        self.bytes = 0
+
+    def report(self, final: bool = False):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        processed = self.written + self.duplicates + self.conflicts + self.failed
+        line = (
+            f"обработано {processed}/{self.found - self.skipped} "
+            f"(записано {self.written}, дубликатов {self.duplicates}, конфликтов номеров {self.conflicts}, "
+            f"ошибок {self.failed}, "
+            f"из кэша разбора {self.cache_hits}, пропущено по checkpoint {self.skipped}) "
+            f"за {elapsed:.1f} с: {processed / elapsed:.1f} файл/с, "
+            f"{self.bytes / elapsed / 1024 / 1024:.2f} МБ/с"
+        )
+        if final:
+            print(f"Итого: {line}")
+        else:
+            print(line, file=sys.stderr)
+
+
+def _extract_batch(pool: ProcessPoolExecutor, workers: int, service: ReportDataService,
+                   items: List[Tuple[str, str]], stats: Stats) -> List[Tuple[str, str, Optional[dict], Optional[str]]]:
+    """Поля отчетов для пачки (путь, хеш): из кэша разбора, промахи разбираются в пуле процессов"""
+    cached = service.parse_cache_repo.get_many((digest for _, digest in items), PARSER_VERSION)
+    misses = [path for path, digest in items if digest not in cached]
+    parsed = {
+        path: (data, error)
+        for path, data, error in pool.map(_parse, misses, chunksize=_chunksize(workers, len(misses)))
+    }
+
+    results = []
+    fresh = {}
+    for path, digest in items:
+        if digest in cached:
+            stats.cache_hits += 1
+            results.append((path, digest, cached[digest], None))
+        else:
+            data, error = parsed[path]
+            if error is None:
+                fresh[digest] = data
+            results.append((path, digest, data, error))
+    service.cache_results(fresh)
+    return results
+
+
+def _load_batch(db: Session, batch: List[Tuple[str, str, Optional[dict], Optional[str]]], user_id: int,
+                copy_files: bool, stats: Stats) -> List[str]:
+    """
+    Загружает пачку разобранных файлов одной транзакцией, возвращает файлы для checkpoint:
+    записанные и дубликаты (тот же номер и то же содержимое, что у отчета в базе или в пачке).
+    Ошибки и конфликты номеров (тот же номер, другое содержимое) в checkpoint не попадают
+    и повторяются при следующем запуске.
+    """
+    reports = {}
+    others = []  # файлы с номером, уже занятым в этой пачке: (номер, путь, хеш)
+    for path, digest, data, error in batch:
+        if error is not None:
+            print(f"Ошибка чтения {path}: {error}", file=sys.stderr)
+            stats.failed += 1
+            continue
+        number = _report_number(path, data)
+        if number is None:
+            print(f"Не удалось однозначно определить номер отчета: {path}", file=sys.stderr)
+            stats.failed += 1
+            continue
+        try:
+            build_report_data(data, 0)
+        except Exception as e:
+            print(f"Неполные данные в {path}: {e}", file=sys.stderr)
+            stats.failed += 1
+            continue
+        if number in reports:
+            others.append((number, path, digest))
+        else:
+            reports[number] = (path, digest, data)
+
+    if not reports:
+        return []
+
+    storage = StorageService(BlobRepository(db))
+    blobs = {}
+    if copy_files:
+        for number, (path, _, _) in reports.items():
+            with open(path, "rb") as source:
+                blobs[number] = storage.save(source)
+            storage.acquire(blobs[number])
+
+    inserted = db.execute(
+        pg_insert(Report)
+        .values([
+            {
+                "path": str(blobs[number].path) if number in blobs else path,
+                "user_id": user_id,
+                "number": number,
+                "file_hash": blobs[number].hash if number in blobs else None,
+                "file_name": os.path.basename(path),
+            }
+            for number, (path, _, _) in reports.items()
+        ])
+        .on_conflict_do_nothing(index_elements=[Report.number])
+        .returning(Report.id, Report.number)
+    ).all()
+    ids = {number: report_id for report_id, number in inserted}
+
+    rows = [
+        build_report_data(data, ids[number]).model_dump()
+        for number, (_, _, data) in reports.items()
+        if number in ids
+    ]
+    if rows:
+        db.execute(insert(ReportData), rows)
+
+    # Ссылки на файлы отчетов, которые уже были в базе, снимаются
+    for number, blob in blobs.items():
+        if number not in ids:
+            storage.release(blob.hash)
+
+    # Содержимое отчета, который хранится под каждым номером: только что записанного или существовавшего
+    stored = {number: digest for number, (_, digest, _) in reports.items() if number in ids}
+    stored.update(_existing_digests(db, [number for number in reports if number not in ids]))
+    db.commit()
+
+    done = []
+    for number, (path, _, _) in reports.items():
+        if number in ids:
+            stats.written += 1
+            done.append(path)
+    candidates = [(number, path, digest) for number, (path, digest, _) in reports.items() if number not in ids]
+    for number, path, digest in candidates + others:
+        # Повтор номера в пачке и номер, уже занятый в базе, оцениваются одинаково
+        if stored.get(number) == digest:
+            stats.duplicates += 1
+        else:
+            print(f"Отчет с номером {number} уже загружен из другого файла: {path}", file=sys.stderr)
+            stats.conflicts += 1
+            continue
+        done.append(path)
+    return done
+
+
+def _existing_digests(db: Session, numbers: List[int]) -> Dict[int, str]:
+    """Хеши содержимого отчетов в базе по номерам; у отчетов без сохраненного хеша файл хешируется"""
+    if not numbers:
+        return {}
+    digests = {}
+    for number, file_hash, path in db.execute(
+        select(Report.number, Report.file_hash, Report.path).where(Report.number.in_(numbers))
+    ):
+        if file_hash is not None:
+            digests[number] = file_hash
+        elif path and os.path.isfile(path):
+            digests[number] = _hash_file(path)[1]
+    return digests
+
+
+def ingest(directory: Path, login: str, workers: int, batch_size: int, checkpoint_path: Path,
+           copy_files: bool) -> Stats:
+    stats = Stats()
+    checkpoint = Checkpoint(checkpoint_path)
+
+    paths = []
+    for path in sorted(directory.rglob("*.docx")):
+        if path.name.startswith("~$"):
+            continue
+        stats.found += 1
+        if str(path) in checkpoint:
+            stats.skipped += 1
+            continue
+        paths.append(str(path))
+
+    db = SessionLocal()
+    try:
+        db_user = UserRepository(db).find_by_login(login)
+        if db_user is None:
+            raise SystemExit(f"Пользователь {login} не найден")
+        service = ReportDataService(ReportDataRepository(db), ParseCacheRepository(db))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch_paths in _batched(paths, batch_size):
+                stats.bytes += sum(os.path.getsize(path) for path in batch_paths)
+                try:
+                    hashed = list(pool.map(_hash_file, batch_paths, chunksize=_chunksize(workers, len(batch_paths))))
+                    batch = _extract_batch(pool, workers, service, hashed, stats)
+                    done = _load_batch(db, batch, db_user.id, copy_files, stats)
+                except Exception:
+                    db.rollback()
+                    raise
+                checkpoint.mark(done)
+                stats.report()
+    finally:
+        db.close()
+
+    return stats
+
+
+def reextract(workers: int, batch_size: int) -> Stats:
+    """
+    Повторно извлекает данные отчетов, разобранных прежней версией парсера.
+    Прогресс хранится в reports_data.parser_version, поэтому прерванный запуск продолжается с места остановки.
+    Если извлеченные значения изменились, результат проверки и расчет погрешностей сбрасываются.
+    """
+    stats = Stats()
+    db = SessionLocal()
+    try:
+        service = ReportDataService(ReportDataRepository(db), ParseCacheRepository(db))
+        stats.found = db.execute(
+            select(func.count()).select_from(ReportData).where(_outdated())
+        ).scalar()
+
+        last_id = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                rows = db.execute(
+                    select(
+                        ReportData.id, ReportData.report_id, ReportData.is_accepted, ReportData.calculated,
+                        *(getattr(ReportData, field) for field in READINGS),
+                        Report.path, Report.file_hash,
+                    )
+                    .join(Report, ReportData.report_id == Report.id)
+                    .where(_outdated(), ReportData.id > last_id)
+                    .order_by(ReportData.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                missing = [row for row in rows if not os.path.isfile(row.path)]
+                for row in missing:
+                    print(f"Файл отчета не найден: {row.path}", file=sys.stderr)
+                stats.failed += len(missing)
+                rows = [row for row in rows if row not in missing]
+
+                unhashed = [row.path for row in rows if row.file_hash is None]
+                digests = dict(pool.map(_hash_file, unhashed, chunksize=_chunksize(workers, len(unhashed))))
+                items = [(row.path, row.file_hash or digests[row.path]) for row in rows]
+                stats.bytes += sum(os.path.getsize(path) for path, _ in items)
+
+                extracted = {path: (data, error) for path, _, data, error in _extract_batch(pool, workers, service, items, stats)}
+                updates = []
+                for row in rows:
+                    data, error = extracted[row.path]
+                    try:
+                        if error is not None:
+                            raise ValueError(error)
+                        fields = build_report_data(data, row.report_id).model_dump(exclude={"report_id", "calculated"})
+                    except Exception as e:
+                        print(f"Не удалось извлечь данные {row.path}: {e}", file=sys.stderr)
+                        stats.failed += 1
+                        continue
+                    changed = any(fields[field] != getattr(row, field) for field in READINGS)
+                    updates.append({
+                        "id": row.id,
+                        **fields,
+                        # Одинаковый набор колонок у всех строк - один UPDATE на пачку
+                        "is_accepted": None if changed else row.is_accepted,
+                        "calculated": False if changed else row.calculated,
+                    })
+                if updates:
+                    db.execute(update(ReportData), updates)
+                db.commit()
+                stats.written += len(updates)
+                stats.report()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return stats
+
+
+def _outdated():
+    return or_(ReportData.parser_version.is_(None), ReportData.parser_version < PARSER_VERSION)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Загрузка архива docx-отчетов в базу данных")
+    parser.add_argument("directory", type=Path, nargs="?", help="Каталог с отчетами (обходится рекурсивно)")
+    parser.add_argument("--login", help="Логин пользователя, от имени которого загружаются отчеты")
+    parser.add_argument("--reextract", action="store_true",
+                        help="Повторно извлечь данные отчетов, разобранных прежней версией парсера")
+    parser.add_argument("--backfill-dates", action="store_true",
+                        help="Заполнить дату и год проверки у ранее загруженных отчетов")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Число процессов для разбора")
+    parser.add_argument("--batch-size", type=int, default=200, help="Число отчетов в одной транзакции")
+    parser.add_argument("--checkpoint", type=Path, default=None,
+                        help="Файл checkpoint (по умолчанию .ingest-checkpoint в каталоге отчетов)")
+    parser.add_argument("--no-copy", action="store_true",
+                        help="Не копировать файлы в хранилище, сохранять исходные пути")
+    args = parser.parse_args(argv)
+
+    if args.backfill_dates:
+        db = SessionLocal()
+        try:
+            service = ReportDataService(ReportDataRepository(db), ParseCacheRepository(db))
+            print(f"Итого: заполнена дата проверки у {service.backfill_test_dates(args.batch_size)} записей")
+        finally:
+            db.close()
+        return
+
+    if args.reextract:
+        stats = reextract(workers=args.workers, batch_size=args.batch_size)
+        stats.report(final=True)
+        return
+
+    if args.directory is None or not args.directory.is_dir():
+        parser.error("укажите каталог с отчетами")
+    if not args.login:
+        parser.error("укажите --login")
+
+    stats = ingest(
+        directory=args.directory,
+        login=args.login,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint or args.directory / ".ingest-checkpoint",
+        copy_files=not args.no_copy,
+    )
+    stats.report(final=True)
+
+
+if __name__ == "__main__":
+    main()
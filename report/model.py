@@ -1,15 +1,20 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from core.config.database import Model
 
 
 class Report(Model):
    __tablename__ = "reports"
+   __table_args__ = (
+      Index("ix_reports_ts_id", "ts", "id"),
+   )
    id = Column(Integer, primary_key=True, autoincrement=True)
-   ts = Column(DateTime, nullable=False, default=datetime.now())
+   ts = Column(DateTime, nullable=False, default=datetime.now)
    user_id = Column(Integer, ForeignKey("users.id"))
    number = Column(Integer, unique=True)
    path = Column(String)
+   file_hash = Column(String(64), ForeignKey("blobs.hash"), nullable=True)
+   file_name = Column(String, nullable=True)
 
    user = relationship("User", back_populates="reports")
\ No newline at end of file
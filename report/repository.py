@@ -1,11 +1,20 @@
-from typing import List, Type
+import time
+from datetime import datetime
+from typing import Iterable, List, Set, Type, Optional, Tuple
 
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, contains_eager
 
 from core.config.dependencies import get_db
+from report_data.model import ReportData
 from .model import Report
-from .schema import ReportCreate, ReportResponse
+from .schema import ReportCreate, ReportResponse, ReportSearchFilter
+
+COUNT_CACHE_TTL = 30  # секунд
+
+# Общее число отчетов кэшируется на процесс, сбрасывается при создании и удалении отчетов
+_count_cache = {"value": None, "expires": 0.0}
 
 
 class ReportRepository:
@@ -16,34 +25,80 @@ class ReportRepository:
         db_report = Report(
             path=report.path,
             user_id=report.user_id,
-            number=report.number
+            number=report.number,
+            file_hash=report.file_hash,
+            file_name=report.file_name
         )
         self.db.add(db_report)
-        self.db.commit()
-        self.db.refresh(db_report)
+        self.db.flush()
         return db_report
 
     def delete(self, report_id: int):
         self.db.query(Report).filter(Report.id == report_id).delete()
         self.db.commit()
+        self.invalidate_count()
 
     def find_by_id(self, report_id: int) -> Report | None:
-        query = self.db.query(Report)
-        return query.join(Report.user).filter(Report.id == report_id).first()
+        return self._with_user().filter(Report.id == report_id).first()
 
     def find_by_number(self, number: int) -> Report | None:
-        query = self.db.query(Report)
-        return query.join(Report.user).filter(Report.number == number).first()
-
-    def all(self, skip: int = 0, max: int = 100) -> List[Type[Report]]:
-        return (
-            self.db.query(Report)
-            .join(Report.user)
-            .offset(skip)
-            .limit(max)
-            .all()
+        return self._with_user().filter(Report.number == number).first()
+
+    def existing_numbers(self, numbers: Iterable[int]) -> Set[int]:
+        """Какие из номеров отчетов есть в БД - одним запросом"""
+        numbers = set(numbers)
+        if not numbers:
+            return set()
+        rows = self.db.query(Report.number).filter(Report.number.in_(numbers)).all()
+        return {number for number, in rows}
+
+    def all(self, skip: int = 0, max: int = 100, after: Optional[Tuple[datetime, int]] = None) -> List[Type[Report]]:
+        """Страница отчетов в порядке (ts, id); after - ключ последнего отчета предыдущей страницы"""
+        query = self._with_user()
+        if after is not None:
+            query = query.filter(tuple_(Report.ts, Report.id) > tuple_(*after))
+        else:
+            query = query.offset(skip)
+        return query.order_by(Report.ts, Report.id).limit(max).all()
+
+    def search(self, filters: ReportSearchFilter, max: int = 100,
+               after: Optional[Tuple[datetime, int]] = None) -> List[Tuple[Report, ReportData]]:
+        """Отчеты с данными по фильтрам, keyset-пагинация по (ts, id)"""
+        query = (
+            self._with_user()
+            .join(ReportData, ReportData.report_id == Report.id)
+            .add_entity(ReportData)
         )
+        if filters.department is not None:
+            query = query.filter(ReportData.department == filters.department)
+        if filters.system_type is not None:
+            query = query.filter(ReportData.system_type == filters.system_type)
+        if filters.system_number is not None:
+            query = query.filter(ReportData.system_number == filters.system_number)
+        if filters.date_from is not None:
+            query = query.filter(Report.ts >= filters.date_from)
+        if filters.date_to is not None:
+            query = query.filter(Report.ts <= filters.date_to)
+        if filters.tested_from is not None:
+            query = query.filter(ReportData.tested_on >= filters.tested_from)
+        if filters.tested_to is not None:
+            query = query.filter(ReportData.tested_on <= filters.tested_to)
+        if after is not None:
+            query = query.filter(tuple_(Report.ts, Report.id) > tuple_(*after))
+        return query.order_by(Report.ts, Report.id).limit(max).all()
 
     def count(self) -> int:
-        return self.db.query(Report).count()
+        now = time.monotonic()
+        if _count_cache["value"] is None or now >= _count_cache["expires"]:
+            _count_cache["value"] = self.db.query(Report).count()
+            _count_cache["expires"] = now + COUNT_CACHE_TTL
+        return _count_cache["value"]
+
+    @staticmethod
+    def invalidate_count():
+        _count_cache["value"] = None
+
+    def _with_user(self):
+        # Автор загружается тем же запросом, без отдельного SELECT на каждую строку
+        return self.db.query(Report).join(Report.user).options(contains_eager(Report.user))
 
@@ -1,12 +1,9 @@
-from fastapi import APIRouter, Depends, status, UploadFile, File, Form
+from typing import Optional
+
+from fastapi import APIRouter, Depends, status, UploadFile, File, Form, Request
 from utils.authenticate import check_authenticate
 from .service import ReportService
-from .schema import ReportResponse, PaginatedReportResponse
-import os
-
-UPLOAD_DIR = "uploads/reports"
-
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+from .schema import ReportResponse, PaginatedReportResponse, ReportSearchFilter, ReportSearchResponse
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -19,6 +16,16 @@ async def create_report(
 ):
     return await report_service.create_report(token, number, file)
 
+@router.get("/search", response_model=ReportSearchResponse)
+def search_reports(
+    filters: ReportSearchFilter = Depends(),
+    max: int = 10,
+    cursor: Optional[str] = None,
+    report_service: ReportService = Depends(),
+    token: dict = Depends(check_authenticate)
+):
+    return report_service.search_reports(filters, max=max, cursor=cursor)
+
 @router.get("/{number}", response_model=ReportResponse)
 def get_report(
     number: int,
@@ -31,15 +38,17 @@ def get_report(
 def get_all_reports(
     skip: int = 0,
     max: int = 10,
+    cursor: Optional[str] = None,
     report_service: ReportService = Depends(),
     token: dict = Depends(check_authenticate)
 ):
-    return report_service.get_all_reports(skip=skip, max=max)
+    return report_service.get_all_reports(skip=skip, max=max, cursor=cursor)
 
 @router.get("/download/{report_id}")
 def download_report(
     report_id: int,
+    request: Request,
     report_service: ReportService = Depends(),
     token: dict = Depends(check_authenticate)
 ):
-    return report_service.download_report(report_id)
\ No newline at end of file
+    return report_service.download_report(report_id, request)
\ No newline at end of file
@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import List
+from datetime import datetime, date
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -7,6 +7,8 @@ class ReportBase(BaseModel):
     path: str
     user_id: int
     number: int
+    file_hash: Optional[str] = None
+    file_name: Optional[str] = None
 
 class Report(ReportBase):
     id: int
@@ -27,4 +29,25 @@ class ReportResponse(Report):
 
 class PaginatedReportResponse(BaseModel):
     count: int
-    reports: List[ReportResponse]
\ No newline at end of file
+    reports: List[ReportResponse]
+    next_cursor: Optional[str] = None
+
+class ReportSearchFilter(BaseModel):
+    department: Optional[str] = None
+    system_type: Optional[str] = None
+    system_number: Optional[int] = None
+    date_from: Optional[datetime] = None    # дата загрузки отчета
+    date_to: Optional[datetime] = None
+    tested_from: Optional[date] = None      # дата проверки системы
+    tested_to: Optional[date] = None
+
+class ReportSearchItem(ReportResponse):
+    department: Optional[str] = None
+    system_type: Optional[str] = None
+    system_number: Optional[int] = None
+    test_date: Optional[str] = None
+    tested_on: Optional[date] = None
+
+class ReportSearchResponse(BaseModel):
+    reports: List[ReportSearchItem]
+    next_cursor: Optional[str] = None
\ No newline at end of file
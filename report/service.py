@@ -1,57 +1,64 @@
-from fastapi import Depends, HTTPException, status, UploadFile
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status, UploadFile, Request, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from core.config.dependencies import get_db
 from report_data.service import ReportDataService
+from storage.service import StorageService
 from user.repository import UserRepository
+from utils.files import file_response
+from utils.pagination import encode_cursor, decode_cursor
 from .repository import ReportRepository
-from .schema import ReportCreate, ReportResponse, PaginatedReportResponse
+from .schema import ReportCreate, ReportResponse, PaginatedReportResponse, ReportSearchFilter, ReportSearchItem, \
+    ReportSearchResponse
 import os
-from fastapi.responses import FileResponse
 
 class ReportService:
     def __init__(self,
                  report_repo: ReportRepository = Depends(),
                  user_repo: UserRepository = Depends(),
                  report_data_service: ReportDataService = Depends(),
+                 storage: StorageService = Depends(),
                  db: Session = Depends(get_db)
                  ):
         self.report_repo = report_repo
         self.user_repo = user_repo
         self.report_data_service = report_data_service
+        self.storage = storage
         self.db = db
 
     async def create_report(self, token: dict, number: int, file: UploadFile) -> ReportResponse:
-        file_path = os.path.join("uploads/reports", file.filename)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
+        blob = await self.storage.save_upload(file)
         db_user = self.user_repo.find_by_login(token.get("sub"))
-        report_id = 0
         try:
+            # Повторно загруженный файл не разбирается: поля берутся из кэша по хешу
+            data = self.report_data_service.extract(str(blob.path), blob.hash)
+            self.storage.acquire(blob)
             db_report = self.report_repo.create(ReportCreate(
-                path=file_path,
+                path=str(blob.path),
                 user_id=db_user.id,
-                number=number
+                number=number,
+                file_hash=blob.hash,
+                file_name=file.filename
             ))
-            report_id=db_report.id
-            await self.report_data_service.create_report_data(db_report.path, report_id)
-            return self._format_report_response(db_report)
+            self.report_data_service.create_report_data(data, db_report.id)
+            self.db.commit()
+            self.report_repo.invalidate_count()
+        except IntegrityError:
+            self.db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Отчет по изделию данного номера уже был загружен ранее"
+            )
         except Exception as e:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            if report_id!=0:
-                self.report_repo.delete(report_id)
-            if "already exists" in str(e):
-                raise HTTPException(
-                    status_code=409,
-                    detail="Отчет по изделию данного номера уже был загружен ранее"
-                )
-            else:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Ошибка чтения файла" + str(e)
-                )
+            self.db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail="Ошибка чтения файла" + str(e)
+            )
+        return self._format_report_response(db_report)
 
     def get_report(self, number: int) -> ReportResponse:
         db_report = self.report_repo.find_by_number(number)
@@ -59,24 +66,53 @@ class ReportService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
         return self._format_report_response(db_report)
 
-    def get_all_reports(self, skip: int = 0, max: int = 10) -> PaginatedReportResponse:
-        db_reports = self.report_repo.all(skip=skip, max=max)
+    def get_all_reports(self, skip: int = 0, max: int = 10, cursor: Optional[str] = None) -> PaginatedReportResponse:
+        after = decode_cursor(cursor) if cursor else None
+        db_reports = self.report_repo.all(skip=skip, max=max, after=after)
         total = self.report_repo.count()
+        next_cursor = None
+        if len(db_reports) == max:
+            next_cursor = encode_cursor(db_reports[-1].ts, db_reports[-1].id)
         return PaginatedReportResponse(
             count=total,
-            reports=[self._format_report_response(report) for report in db_reports]
+            reports=[self._format_report_response(report) for report in db_reports],
+            next_cursor=next_cursor
+        )
+
+    def search_reports(self, filters: ReportSearchFilter, max: int = 10,
+                       cursor: Optional[str] = None) -> ReportSearchResponse:
+        after = decode_cursor(cursor) if cursor else None
+        rows = self.report_repo.search(filters, max=max, after=after)
+        next_cursor = None
+        if len(rows) == max:
+            last_report = rows[-1][0]
+            next_cursor = encode_cursor(last_report.ts, last_report.id)
+        return ReportSearchResponse(
+            reports=[
+                ReportSearchItem(
+                    **self._format_report_response(db_report).model_dump(),
+                    department=report_data.department,
+                    system_type=report_data.system_type,
+                    system_number=report_data.system_number,
+                    test_date=report_data.test_date,
+                    tested_on=report_data.tested_on,
+                )
+                for db_report, report_data in rows
+            ],
+            next_cursor=next_cursor
         )
 
-    def download_report(self, report_id: int) -> FileResponse:
+    def download_report(self, report_id: int, request: Request) -> Response:
         db_report = self.report_repo.find_by_id(report_id)
         if db_report is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
-        if not os.path.exists(db_report.path):
+        if not os.path.isfile(db_report.path):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
-        return FileResponse(
+        return file_response(
+            request,
             db_report.path,
-            content_disposition_type="attachment",
-            filename=os.path.basename(db_report.path),
+            content_hash=db_report.file_hash,
+            filename=db_report.file_name or os.path.basename(db_report.path),
         )
 
     def _format_report_response(self, db_report) -> ReportResponse:
@@ -86,6 +122,8 @@ class ReportService:
             path=db_report.path,
             user_id=db_report.user_id,
             number=db_report.number,
+            file_hash=db_report.file_hash,
+            file_name=db_report.file_name,
             ts=db_report.ts,
             user_fio=initials,
         )
\ No newline at end of file
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey, String, Boolean
+from sqlalchemy import Column, Integer, Date, DateTime, Float, ForeignKey, String, Boolean, JSON, Index, text
 from sqlalchemy.orm import relationship
 
 from core.config.database import Model
@@ -8,18 +8,32 @@ from core.config.database import Model
 
 class ReportData(Model):
     __tablename__ = "reports_data"
+    __table_args__ = (
+        # Индексы под фильтры поиска отчетов (GET /reports/search)
+        Index("ix_reports_data_department_system_type", "department", "system_type", "report_id"),
+        Index("ix_reports_data_system_type", "system_type", "report_id"),
+        Index("ix_reports_data_system_number", "system_number"),
+        Index("ix_reports_data_tested_on", "tested_on"),
+        Index("ix_reports_data_year", "year"),
+        Index("ix_reports_data_report_id", "report_id"),
+        # Частичные индексы под выборки нерассчитанных и непроверенных изделий
+        Index("ix_reports_data_uncalculated", "id", postgresql_where=text("calculated = false")),
+        Index("ix_reports_data_unverified", "id", postgresql_where=text("is_accepted IS NULL")),
+        Index("ix_reports_data_status", "is_accepted", "id", postgresql_where=text("is_accepted IS NOT NULL")),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     ts = Column(DateTime, default=datetime.now())
     report_id = Column(Integer, ForeignKey("reports.id"))
 
     system_name = Column(String)                    # Результаты испытаний системы (название)
-    test_date = Column(String)                      # Дата проверки системы
+    test_date = Column(String)                      # Дата проверки системы (как в отчете)
+    tested_on = Column(Date, nullable=True)         # Дата проверки системы, разобранная при загрузке
     department = Column(String)                     # Часть
     system_type = Column(String)                    # Тип
 
     test_time = Column(Float)                       # Время испытания [мин]
     system_number = Column(Integer)                 # Номер системы
-    year = Column(Integer)                          # Год
+    year = Column(Integer)                          # Год проверки (из tested_on)
     latitude = Column(Float)                        # Широта местоположения [°]
     azimuth_minus_50 = Column(Float)                # Азимут при t = -50 °C [д.у.]
     azimuth_plus_50 = Column(Float)                 # Азимут при t = +50 °C [д.у.]
@@ -33,7 +47,18 @@ class ReportData(Model):
     humidity = Column(Float)                        # Влажность [%]
     vibration_level = Column(Float)                 # Уровень вибрации [дБ]
 
+    parser_version = Column(Integer, nullable=True)  # Версия парсера, которой извлечены данные
+
     calculated = Column(Boolean, default=False)
     is_accepted = Column(Boolean, nullable=True)  # True - принято, False - не принято, None - не проверено
 
-    report = relationship("Report", foreign_keys=[report_id])
\ No newline at end of file
+    report = relationship("Report", foreign_keys=[report_id])
+
+
+class ParseCache(Model):
+    """Результат разбора файла отчета по хешу содержимого и версии парсера"""
+    __tablename__ = "parse_cache"
+    file_hash = Column(String(64), primary_key=True)
+    parser_version = Column(Integer, primary_key=True)
+    data = Column(JSON, nullable=False)
+    ts = Column(DateTime, default=datetime.now, index=True)
@@ -1,8 +1,14 @@
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
 from fastapi.params import Depends
+from sqlalchemy import select, delete, update, exists, func, bindparam, tuple_, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from core.config.dependencies import get_db
-from .model import ReportData
+from .model import ReportData, ParseCache
 from .schema import ReportDataCreate
 
 
@@ -16,6 +22,8 @@ class ReportDataRepository:
 
             system_name=report.system_name,
             test_date=report.test_date,
+            tested_on=report.tested_on,
+            year=report.year,
             department=report.department,
             system_type=report.system_type,
 
@@ -34,14 +42,141 @@ class ReportDataRepository:
             humidity=report.humidity,
             vibration_level=report.vibration_level,
 
+            parser_version=report.parser_version,
             calculated=report.calculated
         )
         self.db.add(db_report_data)
-        self.db.commit()
-        self.db.refresh(db_report_data)
+        return db_report_data
 
     def get_by_report_id(self, report_id: int):
         return self.db.query(ReportData).filter(ReportData.report_id == report_id).first()
 
-    def get_all(self, existing_systems: set):
-        return self.db.query(ReportData).filter(ReportData.system_number.notin_(existing_systems))
\ No newline at end of file
+    def find_undated(self, after_id: int, limit: int) -> List[Tuple[int, str]]:
+        """(id, test_date) строк с неразобранной датой проверки, по возрастанию id"""
+        return self.db.execute(
+            select(ReportData.id, ReportData.test_date)
+            .where(ReportData.tested_on.is_(None), ReportData.test_date.is_not(None), ReportData.id > after_id)
+            .order_by(ReportData.id)
+            .limit(limit)
+        ).all()
+
+    def set_test_dates(self, dates: Dict[int, date]):
+        """Массово записывает дату и год проверки по id, без commit"""
+        if dates:
+            self.db.execute(
+                update(ReportData),
+                [{"id": id, "tested_on": tested_on, "year": tested_on.year} for id, tested_on in dates.items()]
+            )
+
+    def evaluate_acceptance(self, is_accepted) -> Tuple[int, int]:
+        """
+        Проставляет is_accepted непроверенным изделиям одним UPDATE по выражению is_accepted,
+        возвращает (принято, не принято). Без commit.
+        """
+        checked = (
+            update(ReportData)
+            .where(ReportData.is_accepted.is_(None))
+            .values(is_accepted=is_accepted)
+            .returning(ReportData.is_accepted)
+            .cte("checked")
+        )
+        accepted, rejected = self.db.execute(
+            select(
+                func.count().filter(checked.c.is_accepted.is_(True)),
+                func.count().filter(checked.c.is_accepted.is_(False)),
+            )
+        ).one()
+        return accepted, rejected
+
+    def stream_status(self, limit: Optional[int] = None, after: Optional[Tuple[bool, int]] = None,
+                      batch_size: int = 1000):
+        """
+        Проверенные изделия (только поля для списка статусов): сначала принятые, затем непринятые,
+        внутри группы по убыванию id. Строки читаются серверным курсором пачками.
+        """
+        query = (
+            select(
+                ReportData.id,
+                ReportData.system_number,
+                ReportData.system_type,
+                ReportData.department,
+                ReportData.test_date,
+                ReportData.is_accepted,
+            )
+            .where(ReportData.is_accepted.is_not(None))
+            .order_by(ReportData.is_accepted.desc(), ReportData.id.desc())
+            .execution_options(yield_per=batch_size)
+        )
+        if after is not None:
+            query = query.where(tuple_(ReportData.is_accepted, ReportData.id) < tuple_(*after))
+        if limit is not None:
+            query = query.limit(limit)
+        return self.db.execute(query)
+
+    def stream_columns(self, *columns, batch_size: int = 10000) -> Iterator[List[Tuple]]:
+        """Значения указанных колонок всех строк пачками, серверным курсором"""
+        query = select(*columns).order_by(ReportData.id).execution_options(yield_per=batch_size)
+        return self.db.execute(query).partitions()
+
+    def get_all(self, existing_systems: set, batch_size: int = 1000) -> Iterator[ReportData]:
+        """
+        Данные отчетов по системам, которых нет в existing_systems.
+        Множество передается одним параметром-массивом и исключается через NOT EXISTS (anti-join),
+        строки читаются серверным курсором пачками по batch_size.
+        """
+        known = func.unnest(
+            bindparam("existing_systems", list(existing_systems), type_=ARRAY(Integer))
+        ).table_valued("system_number").render_derived()
+        query = (
+            select(ReportData)
+            .where(ReportData.system_number.is_not(None))
+            .where(~exists().where(known.c.system_number == ReportData.system_number))
+            .execution_options(yield_per=batch_size)
+        )
+        return iter(self.db.execute(query).scalars())
+
+
+class ParseCacheRepository:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def get(self, file_hash: str, parser_version: int) -> dict | None:
+        return self.db.execute(
+            select(ParseCache.data)
+            .where(ParseCache.file_hash == file_hash, ParseCache.parser_version == parser_version)
+        ).scalar()
+
+    def get_many(self, file_hashes: Iterable[str], parser_version: int) -> Dict[str, dict]:
+        file_hashes = list(set(file_hashes))
+        if not file_hashes:
+            return {}
+        rows = self.db.execute(
+            select(ParseCache.file_hash, ParseCache.data)
+            .where(ParseCache.file_hash.in_(file_hashes), ParseCache.parser_version == parser_version)
+        ).all()
+        return {file_hash: data for file_hash, data in rows}
+
+    def put_many(self, entries: Dict[str, dict], parser_version: int):
+        """Добавляет результаты разбора в кэш, без commit"""
+        if not entries:
+            return
+        self.db.execute(
+            insert(ParseCache)
+            .values([
+                {"file_hash": file_hash, "parser_version": parser_version, "data": data}
+                for file_hash, data in entries.items()
+            ])
+            .on_conflict_do_nothing()
+        )
+
+    def trim(self, parser_version: int, max_entries: int):
+        """Удаляет записи устаревших версий парсера и самые старые записи сверх лимита, без commit"""
+        self.db.execute(delete(ParseCache).where(ParseCache.parser_version < parser_version))
+        oldest_kept = (
+            select(ParseCache.ts)
+            .order_by(ParseCache.ts.desc())
+            .offset(max_entries - 1)
+            .limit(1)
+            .scalar_subquery()
+        )
+        self.db.execute(delete(ParseCache).where(ParseCache.ts < oldest_kept))
@@ -1,8 +1,13 @@
+from datetime import date
+from typing import Optional
+
 from pydantic import BaseModel
 
 class ReportDataBase(BaseModel):
     system_name: str
     test_date: str
+    tested_on: Optional[date] = None
+    year: Optional[int] = None
     department: str
     system_type: str
 
@@ -22,6 +27,7 @@ class ReportDataBase(BaseModel):
     humidity: float
     vibration_level: float
 
+    parser_version: Optional[int] = None
     calculated: bool
 
 class ReportDataCreate(ReportDataBase):
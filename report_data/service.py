@@ -1,62 +1,71 @@
+import itertools
+import re
+from datetime import date
+from typing import Dict, Optional
+
 from docx import Document
 from fastapi.params import Depends
 
-from report_data.repository import ReportDataRepository
+from core.config.config import settings
+from report_data.repository import ReportDataRepository, ParseCacheRepository
 from report_data.schema import ReportDataCreate
 
+# Увеличивается при любом изменении правил разбора: записи кэша и данные отчетов
+# с меньшей версией считаются устаревшими (см. python -m report.ingest --reextract)
+PARSER_VERSION = 1
+
+_cache_writes = itertools.count(1)
+
+TEST_DATE_PATTERN = re.compile(r"(\d{1,2})[./-](\d{1,2})[./-](\d{2,4})")
+
 
 class ReportDataService:
     def __init__(self,
-                 report_data_repo: ReportDataRepository = Depends()):
+                 report_data_repo: ReportDataRepository = Depends(),
+                 parse_cache_repo: ParseCacheRepository = Depends()):
         self.report_data_repo = report_data_repo
+        self.parse_cache_repo = parse_cache_repo
 
     def get_report_data_by_report_id(self, report_id: int):
         db_report_data = self.report_data_repo.get_by_report_id(report_id)
         return db_report_data
 
-    async def create_report_data(self, path: str, report_id: int):
-        doc = Document(path)
-        data = {}
-
-        # Обработка таблиц (предполагаем структуру: первый столбец - ключ, второй - значение)
-        for table in doc.tables:
-            for row in table.rows:
-                if len(row.cells) >= 2:  # Проверяем, что есть как минимум 2 столбца
-                    key = row.cells[0].text.strip()
-                    value = row.cells[1].text.strip()
-                    self._process_key_value(key, value, data)
-
-        # Обработка параграфов (формат "ключ: значение")
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
-            if ":" in text:
-                key, value = text.split(":", 1)
-                self._process_key_value(key.strip(), value.strip(), data)
-
-        self.report_data_repo.create(ReportDataCreate(
-            report_id=report_id,
-            system_name=data.get("system_name"),
-            test_date=data.get("test_date"),
-            department=data.get("department"),
-            system_type=data.get("system_type"),
-            test_time=data.get("test_time"),
-            system_number=data.get("system_number"),
-            latitude=data.get("latitude"),
-            azimuth_minus_50=data.get("azimuth_minus_50"),
-            azimuth_plus_50=data.get("azimuth_plus_50"),
-            azimuth_nku=data.get("azimuth_nku"),
-            repeated_azimuth_minus_50=data.get("repeated_azimuth_minus_50"),
-            repeated_azimuth_plus_50=data.get("repeated_azimuth_plus_50"),
-            repeated_azimuth_nku=data.get("repeated_azimuth_nku"),
-            azimuth_determination_time=data.get("azimuth_determination_time"),
-            table_position_exact=data.get("table_position_exact"),
-            table_position_repeated=data.get("table_position_repeated"),
-            humidity=data.get("humidity"),
-            vibration_level=data.get("vibration_level"),
-            calculated=False
-        ))
-
-    def _process_key_value(self, key: str, value: str, data: dict):
+    def extract(self, path: str, file_hash: str) -> dict:
+        """Поля отчета из кэша разбора, при промахе - разбор файла с записью в кэш"""
+        data = self.parse_cache_repo.get(file_hash, PARSER_VERSION)
+        if data is None:
+            data = extract_report_fields(path)
+            self.cache_results({file_hash: data})
+        return data
+
+    def cache_results(self, entries: Dict[str, dict]):
+        """Сохраняет результаты разбора в текущей транзакции, периодически ограничивая размер кэша"""
+        self.parse_cache_repo.put_many(entries, PARSER_VERSION)
+        if next(_cache_writes) % settings.cache.trim == 0:
+            self.parse_cache_repo.trim(PARSER_VERSION, settings.cache.size)
+
+    def backfill_test_dates(self, batch_size: int = 1000) -> int:
+        """Заполняет tested_on и year у ранее загруженных строк, возвращает число обновленных"""
+        updated = 0
+        last_id = 0
+        while rows := self.report_data_repo.find_undated(last_id, batch_size):
+            last_id = rows[-1][0]
+            dates = {}
+            for id, test_date in rows:
+                tested_on = parse_test_date(test_date)
+                if tested_on is not None:
+                    dates[id] = tested_on
+            self.report_data_repo.set_test_dates(dates)
+            self.report_data_repo.db.commit()
+            updated += len(dates)
+        return updated
+
+    def create_report_data(self, data: dict, report_id: int):
+        """Добавляет данные отчета в текущую транзакцию (фиксирует вызывающий код)"""
+        return self.report_data_repo.create(build_report_data(data, report_id))
+
+    @staticmethod
+    def _process_key_value(key: str, value: str, data: dict):
         try:
             value = value.replace(",", ".")
 
@@ -97,4 +106,72 @@ class ReportDataService:
             elif "Уровень вибрации" in key:
                 data["vibration_level"] = float(value)
         except (ValueError, AttributeError):
-            pass
\ No newline at end of file
+            pass
+
+
+def extract_report_fields(path: str) -> dict:
+    """Извлекает поля отчета из docx-файла (без обращения к БД, пригодно для пула процессов)"""
+    doc = Document(path)
+    data = {}
+
+    # Обработка таблиц (предполагаем структуру: первый столбец - ключ, второй - значение)
+    for table in doc.tables:
+        for row in table.rows:
+            if len(row.cells) >= 2:  # Проверяем, что есть как минимум 2 столбца
+                key = row.cells[0].text.strip()
+                value = row.cells[1].text.strip()
+                ReportDataService._process_key_value(key, value, data)
+
+    # Обработка параграфов (формат "ключ: значение")
+    for paragraph in doc.paragraphs:
+        text = paragraph.text.strip()
+        if ":" in text:
+            key, value = text.split(":", 1)
+            ReportDataService._process_key_value(key.strip(), value.strip(), data)
+
+    return data
+
+
+def parse_test_date(value: Optional[str]) -> Optional[date]:
+    """Дата проверки из текста отчета (ДД.ММ.ГГГГ, допускаются '-' и '/' и двузначный год)"""
+    if not value:
+        return None
+    match = TEST_DATE_PATTERN.search(value)
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def build_report_data(data: dict, report_id: int) -> ReportDataCreate:
+    tested_on = parse_test_date(data.get("test_date"))
+    return ReportDataCreate(
+        report_id=report_id,
+        system_name=data.get("system_name"),
+        test_date=data.get("test_date"),
+        tested_on=tested_on,
+        year=tested_on.year if tested_on else None,
+        department=data.get("department"),
+        system_type=data.get("system_type"),
+        test_time=data.get("test_time"),
+        system_number=data.get("system_number"),
+        latitude=data.get("latitude"),
+        azimuth_minus_50=data.get("azimuth_minus_50"),
+        azimuth_plus_50=data.get("azimuth_plus_50"),
+        azimuth_nku=data.get("azimuth_nku"),
+        repeated_azimuth_minus_50=data.get("repeated_azimuth_minus_50"),
+        repeated_azimuth_plus_50=data.get("repeated_azimuth_plus_50"),
+        repeated_azimuth_nku=data.get("repeated_azimuth_nku"),
+        azimuth_determination_time=data.get("azimuth_determination_time"),
+        table_position_exact=data.get("table_position_exact"),
+        table_position_repeated=data.get("table_position_repeated"),
+        humidity=data.get("humidity"),
+        vibration_level=data.get("vibration_level"),
+        parser_version=PARSER_VERSION,
+        calculated=False
+    )
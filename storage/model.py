@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime
+
+from core.config.database import Model
+
+
+class Blob(Model):
+    __tablename__ = "blobs"
+    hash = Column(String(64), primary_key=True)     # sha256 содержимого
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    ts = Column(DateTime, default=datetime.now)
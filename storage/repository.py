@@ -0,0 +1,56 @@
+from typing import List, Optional, Set
+
+from fastapi.params import Depends
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config.dependencies import get_db, get_async_db
+from .model import Blob
+
+
+class BlobRepository:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def find(self, digest: str) -> Optional[Blob]:
+        return self.db.query(Blob).filter(Blob.hash == digest).first()
+
+    def acquire(self, digest: str, size: int):
+        """Увеличивает счетчик ссылок (создает запись при первой ссылке), без commit"""
+        self.db.execute(_acquire_statement(digest, size))
+
+    def release(self, digest: str) -> int:
+        """Уменьшает счетчик ссылок и удаляет запись, если ссылок не осталось, без commit"""
+        remaining = self.db.execute(
+            update(Blob)
+            .where(Blob.hash == digest)
+            .values(ref_count=Blob.ref_count - 1)
+            .returning(Blob.ref_count)
+        ).scalar()
+        if remaining is not None and remaining <= 0:
+            self.db.execute(delete(Blob).where(Blob.hash == digest))
+            return 0
+        return remaining or 0
+
+    def existing(self, digests: List[str]) -> Set[str]:
+        """Хеши из digests, на которые есть запись в blobs"""
+        return set(self.db.scalars(select(Blob.hash).where(Blob.hash.in_(digests))))
+
+
+class AsyncBlobRepository:
+    def __init__(self, db: AsyncSession = Depends(get_async_db)):
+        self.db = db
+
+    async def acquire(self, digest: str, size: int):
+        """Увеличивает счетчик ссылок (создает запись при первой ссылке), без commit"""
+        await self.db.execute(_acquire_statement(digest, size))
+
+
+def _acquire_statement(digest: str, size: int):
+    stmt = insert(Blob).values(hash=digest, size=size, ref_count=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[Blob.hash],
+        set_={"ref_count": Blob.ref_count + 1},
+    )
@@ -0,0 +1,11 @@
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class StoredBlob(BaseModel):
+    hash: str
+    size: int
+    path: Path
+    mime: Optional[str] = None  # тип, определенный по первому блоку загруженного файла
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional
+
+import aiofiles
+from fastapi import HTTPException, UploadFile, status
+from fastapi.params import Depends
+
+from core.config.config import settings
+from utils.files import sniff_mime
+from .repository import BlobRepository
+from .schema import StoredBlob
+from .thumbnails import thumbnail_path
+
+CHUNK_SIZE = 1024 * 1024
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class StorageService:
+    """
+    Хранилище файлов по хешу содержимого.
+
+    Файл с хешем abcdef... лежит в <root>/ab/cd/abcdef..., одинаковые файлы
+    хранятся один раз, число ссылок на файл учитывается в таблице blobs.
+    Запись атомарная: во временный файл в <root>/tmp, затем rename.
+    Запросы файлы не удаляют: файлы без записи в blobs удаляет sweep по истечении срока.
+    """
+
+    def __init__(self, blob_repo: BlobRepository = Depends()):
+        self.blob_repo = blob_repo
+        self.root = Path(settings.storage.root)
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def find(self, digest: str) -> Optional[Path]:
+        """Путь к файлу по хешу или None, если хеш некорректный или файла нет"""
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        path = self.path_for(digest)
+        return path if path.exists() else None
+
+    def save(self, source: BinaryIO) -> StoredBlob:
+        """Сохраняет поток в хранилище (без учета ссылок, см. acquire)"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = self._temp_file()
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := source.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+            return self._commit_temp(tmp_path, digest.hexdigest(), size)
+        except BaseException:
+            self._unlink(tmp_path)
+            raise
+
+    async def save_upload(self, file: UploadFile, max_size: Optional[int] = None) -> StoredBlob:
+        """
+        Сохраняет загруженный файл в хранилище (без учета ссылок, см. acquire).
+        Файл читается блоками: хеш считается на лету, тип определяется по первому блоку,
+        при превышении max_size (по умолчанию storage.limit) загрузка прерывается с 413.
+        """
+        max_size = settings.storage.limit if max_size is None else max_size
+        digest = hashlib.sha256()
+        size = 0
+        mime = None
+        fd, tmp_path = self._temp_file()
+        os.close(fd)
+        try:
+            async with aiofiles.open(tmp_path, "wb") as out:
+                while chunk := await file.read(CHUNK_SIZE):
+                    if mime is None:
+                        mime = sniff_mime(chunk, file.filename)
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Файл превышает допустимый размер ({max_size // (1024 * 1024)} МБ)"
+                        )
+                    digest.update(chunk)
+                    await out.write(chunk)
+            blob = self._commit_temp(tmp_path, digest.hexdigest(), size)
+            blob.mime = mime or sniff_mime(b"", file.filename)
+            return blob
+        except BaseException:
+            self._unlink(tmp_path)
+            raise
+
+    def acquire(self, blob: StoredBlob):
+        """Учитывает новую ссылку на файл в текущей транзакции"""
+        self.blob_repo.acquire(blob.hash, blob.size)
+
+    def release(self, digest: str):
+        """Снимает ссылку на файл; файл без ссылок остается до sweep"""
+        self.blob_repo.release(digest)
+
+    def find_thumbnail(self, digest: str) -> Optional[Path]:
+        """Путь к миниатюре файла или None, если ее нет (еще не построена или файл не изображение)"""
+        path = self.find(digest)
+        if path is None:
+            return None
+        thumbnail = thumbnail_path(path)
+        return thumbnail if thumbnail.exists() else None
+
+    def sweep(self, grace: float, batch_size: int = 1000) -> int:
+        """
+        Удаляет файлы (с миниатюрами), на которые нет записи в blobs и которые не менялись дольше grace секунд,
+        и брошенные временные файлы. Срок защищает файлы загрузок, ссылка на которые еще не закоммичена:
+        сохранение уже существующего файла обновляет его mtime. Возвращает число удаленных файлов
+        """
+        removed = 0
+        for batch in _batched(self._stale_blobs(grace), batch_size):
+            referenced = self.blob_repo.existing([path.name for path in batch])
+            for path in batch:
+                if path.name not in referenced and self._is_stale(path, grace):
+                    self._unlink(path)
+                    self._unlink(thumbnail_path(path))
+                    removed += 1
+        tmp_dir = self.root / "tmp"
+        if tmp_dir.is_dir():
+            for path in tmp_dir.iterdir():
+                if self._is_stale(path, grace):
+                    self._unlink(path)
+                    removed += 1
+        return removed
+
+    def _stale_blobs(self, grace: float) -> Iterator[Path]:
+        for path in self.root.glob("??/??/*"):
+            if DIGEST_PATTERN.match(path.name) and self._is_stale(path, grace):
+                yield path
+
+    @staticmethod
+    def _is_stale(path: Path, grace: float) -> bool:
+        try:
+            return path.stat().st_mtime < time.time() - grace
+        except FileNotFoundError:
+            return False
+
+    def _temp_file(self):
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkstemp(dir=tmp_dir)
+
+    def _commit_temp(self, tmp_path: str, digest: str, size: int) -> StoredBlob:
+        path = self.path_for(digest)
+        if path.exists():
+            self._unlink(tmp_path)
+            # Свежий mtime не дает sweep удалить файл, пока ссылка на него не закоммичена
+            os.utime(path)
+            return StoredBlob(hash=digest, size=size, path=path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, path)
+        return StoredBlob(hash=digest, size=size, path=path)
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _batched(items, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
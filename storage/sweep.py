@@ -0,0 +1,32 @@
+"""
+Удаление файлов хранилища, на которые не осталось ссылок.
+
+Пример запуска (например, раз в сутки по cron):
+    python -m storage.sweep --grace-hours 24
+"""
+import argparse
+from typing import List, Optional
+
+from core.config.database import SessionLocal
+from storage.repository import BlobRepository
+from storage.service import StorageService
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Удаление файлов хранилища без ссылок")
+    parser.add_argument("--grace-hours", type=float, default=24,
+                        help="Не трогать файлы, измененные позднее указанного числа часов назад")
+    args = parser.parse_args(argv)
+    if args.grace_hours <= 0:
+        parser.error("--grace-hours должен быть больше нуля")
+
+    db = SessionLocal()
+    try:
+        removed = StorageService(BlobRepository(db)).sweep(args.grace_hours * 3600)
+    finally:
+        db.close()
+    print(f"Удалено файлов: {removed}")
+
+
+if __name__ == "__main__":
+    main()
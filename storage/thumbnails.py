@@ -0,0 +1,86 @@
+"""
+Миниатюры изображений-вложений.
+
+Миниатюра лежит рядом с файлом в хранилище (<hash>.thumb.jpg) и строится
+в фоне пулом процессов после загрузки. Pillow - необязательная зависимость:
+без нее миниатюры не строятся и thumbnail_url не выдается.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Set
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from core.config.config import settings
+
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_MIME = "image/jpeg"
+THUMBNAIL_MIMES = {"image/png", "image/jpeg", "image/gif", "image/webp", "image/bmp"}
+
+_pending: Set[asyncio.Future] = set()
+
+
+def supports(mime: Optional[str]) -> bool:
+    return Image is not None and mime in THUMBNAIL_MIMES
+
+
+def thumbnail_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.thumb.jpg")
+
+
+def make_thumbnail(source: str, target: str) -> bool:
+    """Строит миниатюру (выполняется в процессе пула); запись атомарная - через временный файл"""
+    with Image.open(source) as image:
+        image.draft("RGB", THUMBNAIL_SIZE)  # JPEG декодируется сразу в уменьшенном масштабе
+        image.thumbnail(THUMBNAIL_SIZE)
+        if image.mode != "RGB":
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                image.save(out, "JPEG", quality=80, optimize=True)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return True
+
+
+@lru_cache
+def _executor() -> ProcessPoolExecutor:
+    # spawn: fork из воркера uvicorn скопировал бы в процессы пула цикл событий, потоки и соединения пулов БД
+    return ProcessPoolExecutor(max_workers=settings.storage.workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def schedule(path: Path, mime: Optional[str]):
+    """Ставит построение миниатюры в фоновый пул, не дожидаясь результата"""
+    if not supports(mime):
+        return
+    target = thumbnail_path(path)
+    if target.exists():
+        return
+    future = asyncio.get_running_loop().run_in_executor(_executor(), make_thumbnail, str(path), str(target))
+    _pending.add(future)
+    future.add_done_callback(_done)
+
+
+def _done(future: asyncio.Future):
+    _pending.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Thumbnail error: {str(future.exception())}")
+
+
+def shutdown():
+    if _executor.cache_info().currsize:
+        _executor().shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from core.config.config import settings
+from inaccuracy import rules
+
+
+@pytest.fixture
+def profiles_file(monkeypatch, tmp_path):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps([
+        {"name": "strict", "version": 1, "mode": "all"},
+        {"name": "strict", "version": 2, "mode": "all", "thresholds": {"nku": 2, "minus_50": 2, "plus_50": None}},
+    ]))
+    monkeypatch.setattr(settings.acceptance, "file", str(path))
+    rules.load_profiles.cache_clear()
+    yield path
+    rules.load_profiles.cache_clear()
+
+
+def test_profiles_are_loaded_from_file(profiles_file):
+    assert set(rules.load_profiles()) == {("default", 1), ("strict", 1), ("strict", 2)}
+
+
+def test_active_profile_by_name_and_version(profiles_file, monkeypatch):
+    monkeypatch.setattr(settings.acceptance, "profile", "strict")
+    assert rules.get_active_profile().version == 2
+
+    monkeypatch.setattr(settings.acceptance, "profile", "strict:1")
+    assert rules.get_active_profile().thresholds.nku == 3
+
+
+def test_unknown_profile(profiles_file):
+    with pytest.raises(HTTPException):
+        rules.get_profile("strict", 3)
+
+
+def test_invalid_profile_file_is_rejected(profiles_file):
+    profiles_file.write_text(json.dumps([{"name": "broken", "version": 1, "mode": "some"}]))
+
+    with pytest.raises(ValueError):
+        rules.load_profiles()
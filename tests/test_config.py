@@ -0,0 +1,21 @@
+from core.config.config import Settings
+
+
+def test_storage_settings_from_environment(monkeypatch):
+    monkeypatch.setenv("APP_STORAGE_REDIRECT", "/internal/blobs")
+    monkeypatch.setenv("APP_STORAGE_LIMIT", "1024")
+
+    settings = Settings(_env_file=None)
+
+    assert settings.storage.redirect == "/internal/blobs"
+    assert settings.storage.limit == 1024
+
+
+def test_parse_cache_settings_from_environment(monkeypatch):
+    monkeypatch.setenv("APP_CACHE_SIZE", "500")
+    monkeypatch.setenv("APP_CACHE_TRIM", "10")
+
+    settings = Settings(_env_file=None)
+
+    assert settings.cache.size == 500
+    assert settings.cache.trim == 10
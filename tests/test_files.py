@@ -0,0 +1,39 @@
+from starlette.requests import Request
+
+from core.config.config import settings
+from utils.files import file_response
+
+
+def _request(headers=()):
+    return Request({"type": "http", "method": "GET", "headers": [(k.encode(), v.encode()) for k, v in headers]})
+
+
+def test_accel_redirect_for_storage_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.storage, "root", str(tmp_path))
+    monkeypatch.setattr(settings.storage, "redirect", "/internal/blobs/")
+    path = tmp_path / "ab" / "cd" / "abcd"
+
+    response = file_response(_request(), path, content_hash="abcd", filename="отчет.docx")
+
+    assert response.headers["x-accel-redirect"] == "/internal/blobs/ab/cd/abcd"
+    assert response.headers["content-disposition"].startswith("attachment; filename*=utf-8''")
+    assert response.headers["etag"] == '"abcd"'
+    assert response.body == b""
+
+
+def test_files_outside_storage_are_sent_by_app(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.storage, "root", str(tmp_path / "blobs"))
+    monkeypatch.setattr(settings.storage, "redirect", "/internal/blobs")
+    path = tmp_path / "legacy.txt"
+    path.write_text("data")
+
+    response = file_response(_request(), path)
+
+    assert "x-accel-redirect" not in response.headers
+    assert response.path == path
+
+
+def test_not_modified(tmp_path):
+    response = file_response(_request([("if-none-match", '"abcd"')]), tmp_path / "abcd", content_hash="abcd")
+
+    assert response.status_code == 304
@@ -0,0 +1,50 @@
+import hashlib
+
+from report.ingest import Stats, _load_batch, _report_number
+from user.model import User
+
+DATA = dict(
+    system_name="s", test_date="01.02.2024", department="d", system_type="t", test_time=1.0, system_number=7,
+    latitude=1.0, azimuth_minus_50=1.0, azimuth_plus_50=1.0, azimuth_nku=1.0, repeated_azimuth_minus_50=1.0,
+    repeated_azimuth_plus_50=1.0, repeated_azimuth_nku=1.0, azimuth_determination_time=1.0,
+    table_position_exact=1.0, table_position_repeated=1.0, humidity=1.0, vibration_level=1.0,
+)
+
+
+def test_report_number_from_file_name():
+    assert _report_number("/a/Отчет 123.docx", DATA) == 123
+    assert _report_number("/a/2023-05-01 изделие 7.docx", DATA) == 7
+    assert _report_number("/a/отчет.docx", DATA) == 7
+    assert _report_number("/a/2023 55.docx", DATA) is None
+
+
+def _file(tmp_path, name: str, content: bytes):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path), hashlib.sha256(content).hexdigest(), DATA, None
+
+
+def test_checkpoint_and_collisions(db, tmp_path):
+    user = User(login="ingest", fname="a", lname="b", password="p")
+    db.add(user)
+    db.flush()
+
+    first, second = Stats(), Stats()
+    original = _file(tmp_path, "10.docx", b"original")
+    done = _load_batch(db, [
+        original,
+        _file(tmp_path, "10 copy.docx", b"original"),
+        _file(tmp_path, "10 other.docx", b"other"),
+        (str(tmp_path / "broken.docx"), "x", None, "bad file"),
+        _file(tmp_path, "2023 55.docx", b"ambiguous"),
+    ], user.id, copy_files=False, stats=first)
+
+    assert done == [original[0], str(tmp_path / "10 copy.docx")]
+    assert (first.written, first.duplicates, first.conflicts, first.failed) == (1, 1, 1, 2)
+
+    # Тот же номер в следующей пачке оценивается так же, как внутри пачки
+    again = _file(tmp_path, "10 again.docx", b"original")
+    done = _load_batch(db, [again, _file(tmp_path, "10 changed.docx", b"changed")], user.id, copy_files=False, stats=second)
+
+    assert done == [again[0]]
+    assert (second.written, second.duplicates, second.conflicts, second.failed) == (0, 1, 1, 0)
@@ -0,0 +1,58 @@
+import asyncio
+
+from fastapi import FastAPI, File, UploadFile
+
+from utils.limits import BodySizeLimitMiddleware
+
+BOUNDARY = b"b"
+app = FastAPI()
+parsed = []
+
+
+@app.post("/upload")
+async def upload(file: UploadFile = File(...)):
+    parsed.append(file.filename)
+    return {"size": len(await file.read())}
+
+
+def _multipart(size: int):
+    return [
+        b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.txt\"\r\n\r\n",
+        *[b"x" * 256 for _ in range(size // 256)],
+        b"\r\n--b--\r\n",
+    ]
+
+
+def _post(chunks, content_length: bool = True) -> int:
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+    if content_length:
+        headers.append((b"content-length", str(sum(map(len, chunks))).encode()))
+    scope = {"type": "http", "method": "POST", "path": "/upload", "headers": headers, "query_string": b""}
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    parsed.clear()
+    asyncio.run(BodySizeLimitMiddleware(app, max_size=1024)(scope, receive, send))
+    return sent[0]["status"]
+
+
+def test_small_body_passes():
+    assert _post(_multipart(256)) == 200
+    assert parsed == ["a.txt"]
+
+
+def test_content_length_over_limit_is_rejected_before_parsing():
+    assert _post(_multipart(4096)) == 413
+    assert parsed == []
+
+
+def test_streamed_body_over_limit_is_rejected():
+    assert _post(_multipart(4096), content_length=False) == 413
+    assert parsed == []
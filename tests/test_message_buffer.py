@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from message.buffer import RecentMessages
+from message.router import deliver_event
+from user import repository as user_repository
+from user.repository import AsyncUserRepository
+from user.schema import UserProfile
+
+
+def _message(id: int, user_id: int) -> dict:
+    return {"id": id, "user_id": user_id, "ts": f"2026-01-01T00:00:0{id}", "content": str(id),
+            "user_name": "Иван Петров", "user_role": "user"}
+
+
+def _buffer(*messages) -> RecentMessages:
+    buffer = RecentMessages(capacity=10)
+
+    async def fetch(limit):
+        return list(messages)
+
+    asyncio.run(buffer.load(fetch))
+    return buffer
+
+
+def test_user_updated_reencodes_authors_messages():
+    buffer = _buffer(_message(1, 7), _message(2, 8), _message(3, 7))
+
+    buffer.apply({"type": "user_updated", "user_id": 7, "profile": {"name": "Иван Петров", "role": "admin"}})
+
+    page, _ = buffer.page(10)
+    assert [(m["id"], m["user_role"]) for m in map(json.loads, page)] == [(1, "admin"), (2, "user"), (3, "admin")]
+
+
+def test_removed_and_evicted_messages_forget_author():
+    buffer = _buffer()
+    buffer.capacity = 1
+    buffer.apply({"type": "message", "message": _message(1, 7)})
+    buffer.apply({"type": "message", "message": _message(2, 7)})
+    buffer.apply({"type": "message_deleted", "message": _message(2, 7)})
+
+    buffer.apply({"type": "user_updated", "user_id": 7, "profile": {"name": "Иван Петров", "role": "admin"}})
+
+    assert buffer._authors == {}
+
+
+def test_deliver_user_updated_refreshes_profile_cache(monkeypatch):
+    monkeypatch.setitem(user_repository._profile_cache, 7, UserProfile(name="Иван Петров", role="user"))
+
+    asyncio.run(deliver_event({"type": "user_updated", "user_id": 7,
+                               "profile": {"name": "Иван Петров", "role": "admin"}}))
+
+    assert user_repository._profile_cache[7].role == "admin"
+
+
+def test_user_updated_does_not_cache_unknown_profiles():
+    AsyncUserRepository.remember_profile(-1, UserProfile(name="Иван Петров", role="admin"))
+
+    assert -1 not in user_repository._profile_cache
+
+
+def test_event_before_load_does_not_truncate_history():
+    stored = [_message(id, 7) for id in range(1, 10)]
+    buffer = RecentMessages(capacity=5)
+    buffer.apply({"type": "message", "message": stored[-1]})
+
+    async def fetch(limit):
+        return stored[-limit:]
+
+    asyncio.run(buffer.load(fetch))
+
+    page, next_key = buffer.page(3)
+    assert [json.loads(m)["id"] for m in page] == [7, 8, 9]
+    assert next_key is not None
+    assert buffer.page(10) is None  # старше буфера - из БД
+
+
+def test_events_during_load_are_applied_after_it():
+    buffer = RecentMessages(capacity=10)
+
+    async def fetch(limit):
+        buffer.apply({"type": "message", "message": _message(2, 7)})
+        buffer.apply({"type": "message_deleted", "message": _message(1, 7)})
+        return [_message(1, 7)]
+
+    asyncio.run(buffer.load(fetch))
+
+    page, _ = buffer.page(10)
+    assert [json.loads(m)["id"] for m in page] == [2]
+
+
+def test_reset_during_load_leaves_buffer_unloaded():
+    buffer = RecentMessages(capacity=10)
+
+    async def fetch(limit):
+        buffer.reset()
+        return [_message(1, 7)]
+
+    asyncio.run(buffer.load(fetch))
+
+    assert not buffer.loaded
+    assert buffer.page(10) is None
@@ -0,0 +1,35 @@
+from product.repository import ProductRepository
+from product.schema import ProductCreate
+
+
+def test_create_many_keeps_order(db):
+    products = ProductRepository(db).create_many([ProductCreate(name=name, is_accepted=False) for name in ("a", "b", "c")])
+
+    assert [product.name for product in products] == ["a", "b", "c"]
+    assert all(product.id is not None for product in products)
+
+
+def test_update_status_many(db):
+    repository = ProductRepository(db)
+    first, second, third = repository.create_many([ProductCreate(name=name, is_accepted=False) for name in ("a", "b", "c")])
+    db.expunge_all()
+
+    updated = repository.update_status_many({first.id: True, third.id: False, -1: True})
+
+    assert {product.id: product.is_accepted for product in updated} == {first.id: True, third.id: False}
+    assert repository.find_by_id(second.id).is_accepted is False
+
+
+def test_find_all_by_status_puts_unverified_last(db):
+    repository = ProductRepository(db)
+    unverified, rejected, accepted = repository.create_many([
+        ProductCreate(name="a", is_accepted=False),
+        ProductCreate(name="b", is_accepted=False),
+        ProductCreate(name="c", is_accepted=True),
+    ])
+    unverified.is_accepted = None
+    db.flush()
+
+    ids = [product.id for product in repository.find_all_by_status()]
+
+    assert ids == [accepted.id, rejected.id, unverified.id]
@@ -0,0 +1,20 @@
+from report_data.model import ReportData
+from report_data.repository import ReportDataRepository
+
+
+def test_get_all_excludes_existing_systems(db):
+    db.add_all([ReportData(system_number=number) for number in (1, 2, 3)] + [ReportData(system_number=None)])
+    db.flush()
+
+    rows = list(ReportDataRepository(db).get_all({1, 3}))
+
+    assert [row.system_number for row in rows] == [2]
+
+
+def test_get_all_with_empty_set_returns_all_systems(db):
+    db.add_all([ReportData(system_number=number) for number in (1, 2)])
+    db.flush()
+
+    rows = list(ReportDataRepository(db).get_all(set()))
+
+    assert sorted(row.system_number for row in rows) == [1, 2]
@@ -0,0 +1,45 @@
+import io
+import os
+import time
+
+from core.config.config import settings
+from storage.repository import BlobRepository
+from storage.service import StorageService
+from storage.thumbnails import thumbnail_path
+
+
+def _age(path, hours: float):
+    stamp = time.time() - hours * 3600
+    os.utime(path, (stamp, stamp))
+
+
+def test_sweep_removes_only_old_unreferenced_files(db, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.storage, "root", str(tmp_path))
+    storage = StorageService(BlobRepository(db))
+    kept = storage.save(io.BytesIO(b"referenced"))
+    storage.acquire(kept)
+    orphan = storage.save(io.BytesIO(b"orphan"))
+    thumbnail_path(orphan.path).write_bytes(b"thumb")
+    fresh = storage.save(io.BytesIO(b"fresh"))
+    for path in (kept.path, orphan.path, thumbnail_path(orphan.path)):
+        _age(path, 48)
+
+    assert storage.sweep(24 * 3600) == 1
+
+    assert kept.path.exists()
+    assert fresh.path.exists()
+    assert not orphan.path.exists()
+    assert not thumbnail_path(orphan.path).exists()
+
+
+def test_saving_existing_file_protects_it_from_sweep(db, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.storage, "root", str(tmp_path))
+    storage = StorageService(BlobRepository(db))
+    released = storage.save(io.BytesIO(b"data"))
+    _age(released.path, 48)
+
+    # Повторная загрузка того же файла, ссылка на который еще не закоммичена
+    storage.save(io.BytesIO(b"data"))
+
+    assert storage.sweep(24 * 3600) == 0
+    assert released.path.exists()
@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from message import router
+from message.service import MessageService
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    frames = []
+    monkeypatch.setattr(router.manager, "send", lambda websocket, frame: frames.append(frame))
+    return frames
+
+
+@pytest.mark.parametrize("command", [
+    {"type": "load_older", "limit": "5"},
+    {"type": "load_older", "limit": 0},
+    {"type": "load_older", "cursor": 123},
+    {"type": "load_older", "cursor": "not-a-cursor"},
+])
+def test_bad_load_older_is_answered_with_error(sent, command):
+    service = MessageService.__new__(MessageService)
+
+    asyncio.run(router._handle_command(None, service, command))
+
+    assert [frame["type"] for frame in sent] == ["error"]
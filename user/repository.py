@@ -1,14 +1,41 @@
-from typing import List, Type
+from typing import Dict, Iterable, List, Optional, Type
 
 from fastapi.params import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from core.config.dependencies import get_db
-from user.schema import UserCreate
+from core.config.dependencies import get_db, get_async_db
+from user.schema import UserCreate, UserProfile
 from user.model import User
 
 import bcrypt
 
+PROFILE_CACHE_SIZE = 10000
+
+# Имя и роль пользователей кэшируются на процесс; при смене роли все воркеры получают
+# новый профиль событием user_updated из общего канала чата
+_profile_cache: Dict[int, UserProfile] = {}
+
+
+def _cached_profiles(ids: Iterable[int]):
+    ids = set(ids)
+    profiles = {id: _profile_cache[id] for id in ids if id in _profile_cache}
+    return profiles, ids - profiles.keys()
+
+
+def _remember_profiles(rows) -> Dict[int, UserProfile]:
+    if len(_profile_cache) + len(rows) > PROFILE_CACHE_SIZE:
+        _profile_cache.clear()
+    profiles = {}
+    for id, fname, lname, role in rows:
+        profiles[id] = _profile_cache[id] = _profile(fname, lname, role)
+    return profiles
+
+
+def _profile(fname: str, lname: str, role) -> UserProfile:
+    return UserProfile(name=f"{fname} {lname}", role=role.value)
+
 
 class UserRepository:
     def __init__(self, db: Session = Depends(get_db)):
@@ -22,6 +49,14 @@ class UserRepository:
         query = self.db.query(User)
         return query.filter(User.login == login).first()
 
+    @staticmethod
+    def invalidate_profile(id: int):
+        _profile_cache.pop(id, None)
+
+    @staticmethod
+    def profile_of(db_user: User) -> UserProfile:
+        return _profile(db_user.fname, db_user.lname, db_user.role)
+
     def all(self, skip: int = 0, max: int = 100) -> List[Type[User]]:
         query = self.db.query(User)
         return query.offset(skip).limit(max).all()
@@ -41,4 +76,33 @@ class UserRepository:
         self.db.commit()
         self.db.refresh(db_user)
 
-        return db_user
\ No newline at end of file
+        return db_user
+
+
+class AsyncUserRepository:
+    """Чтение пользователей через асинхронную сессию (подсистема сообщений)"""
+
+    def __init__(self, db: AsyncSession = Depends(get_async_db)):
+        self.db = db
+
+    async def find_by_login(self, login: str) -> Optional[User]:
+        return await self.db.scalar(select(User).where(User.login == login))
+
+    async def get_profile(self, id: int) -> Optional[UserProfile]:
+        return (await self.get_profiles([id])).get(id)
+
+    async def get_profiles(self, ids: Iterable[int]) -> Dict[int, UserProfile]:
+        """Профили по id: из кэша, недостающие - одним запросом IN"""
+        profiles, missing = _cached_profiles(ids)
+        if missing:
+            rows = (await self.db.execute(
+                select(User.id, User.fname, User.lname, User.role).where(User.id.in_(missing))
+            )).all()
+            profiles.update(_remember_profiles(rows))
+        return profiles
+
+    @staticmethod
+    def remember_profile(id: int, profile: UserProfile):
+        """Профиль из события user_updated заменяет закэшированный"""
+        if id in _profile_cache:
+            _profile_cache[id] = profile
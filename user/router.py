@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from typing import List
+from .repository import UserRepository
 from .service import UserService
 from user.schema import User, UserCreate, UserLogin, UserLoginResponse, UpdateUserRole
 from fastapi.security import OAuth2PasswordBearer
 from utils.authenticate import check_authenticate, check_admin
+from message.backplane import backplane
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -73,10 +76,17 @@ def get_user(
     response_model=User,
     status_code=status.HTTP_200_OK
 )
-def update_user_role(
+async def update_user_role(
     user_id: int,
     update_data: UpdateUserRole,
     user_service: UserService = Depends(),
     token: dict = Depends(check_admin)  # Только админ может менять роли
 ):
-    return user_service.update_user_role(user_id, update_data)
\ No newline at end of file
+    db_user = await run_in_threadpool(user_service.update_user_role, user_id, update_data)
+    # Новый профиль получают кэши профилей и буферы чата всех воркеров, а также клиенты чата
+    await backplane.publish({
+        "type": "user_updated",
+        "user_id": db_user.id,
+        "profile": UserRepository.profile_of(db_user).model_dump()
+    })
+    return db_user
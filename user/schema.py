@@ -44,4 +44,10 @@ class UserLoginResponse(User):
 
 
 class UpdateUserRole(BaseModel):
-    role: UserRole
\ No newline at end of file
+    role: UserRole
+
+
+class UserProfile(BaseModel):
+    """Имя и роль автора для отображения в чате"""
+    name: str
+    role: str
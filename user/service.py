@@ -65,6 +65,7 @@ class UserService:
         # Обновляем роль
         db_user.role = update_data.role
         self.user_repository.db.commit()
+        self.user_repository.invalidate_profile(user_id)
         self.user_repository.db.refresh(db_user)
 
         return db_user
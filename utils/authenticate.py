@@ -7,7 +7,7 @@ from typing import Optional
 
 from core.config.config import settings
 from user.model import UserRole
-from user.repository import UserRepository
+from user.repository import AsyncUserRepository
 from .jwt_auth import decode_token
 from user.service import UserService
 
@@ -38,7 +38,7 @@ def check_admin(token: str = Depends(oauth2_scheme)):
         )
     return payload
 
-async def get_current_user_ws(websocket: WebSocket, user_repo: UserRepository = Depends()):
+async def get_current_user_ws(websocket: WebSocket, user_repo: AsyncUserRepository = Depends()):
     token = websocket.query_params.get("token")
     if not token:
         return None
@@ -49,7 +49,7 @@ async def get_current_user_ws(websocket: WebSocket, user_repo: UserRepository =
             return None
 
         login = payload.get("sub")
-        return user_repo.find_by_login(login)
+        return await user_repo.find_by_login(login)
     except Exception:
         return None
 
@@ -0,0 +1,121 @@
+import mimetypes
+import os
+from os import PathLike
+from typing import Optional, Union
+from urllib.parse import quote
+
+from fastapi import Request, Response
+from starlette import status
+from starlette.responses import FileResponse
+
+from core.config.config import settings
+
+# Файлы в хранилище адресуются хешем содержимого и никогда не меняются
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+class BlobFileResponse(FileResponse):
+    # Крупные блоки - меньше итераций цикла отправки на больших файлах
+    chunk_size = 1024 * 1024
+
+
+# Сигнатуры в начале файла: (смещение, байты, тип)
+SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"BM", "image/bmp"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x1f\x8b", "application/gzip"),
+    (0, b"Rar!\x1a\x07", "application/vnd.rar"),
+    (0, b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"OggS", "audio/ogg"),
+    (4, b"ftyp", "video/mp4"),
+)
+# Контейнеры, конкретный тип которых (docx, xlsx, doc, ...) определяется по расширению
+CONTAINERS = {"application/zip", "application/x-ole-storage"}
+
+
+def sniff_mime(head: bytes, filename: Optional[str] = None) -> str:
+    """Тип содержимого по первым байтам файла, для контейнеров и неизвестных сигнатур - по имени"""
+    sniffed = None
+    if head.startswith(b"PK\x03\x04"):
+        sniffed = "application/zip"
+    elif head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        sniffed = "image/webp"
+    else:
+        for offset, signature, mime in SIGNATURES:
+            if head[offset:offset + len(signature)] == signature:
+                sniffed = mime
+                break
+    guessed = mimetypes.guess_type(filename)[0] if filename else None
+    if sniffed is None or (sniffed in CONTAINERS and guessed):
+        return guessed or "application/octet-stream"
+    return "application/octet-stream" if sniffed == "application/x-ole-storage" else sniffed
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _accel_redirect_uri(path: Union[str, PathLike]) -> Optional[str]:
+    """URI файла в internal-location nginx, если он включен и файл лежит в хранилище"""
+    prefix = settings.storage.redirect
+    if not prefix:
+        return None
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(settings.storage.root))
+    if relative == os.curdir or relative.startswith(os.pardir):
+        return None
+    return prefix.rstrip("/") + "/" + quote(relative.replace(os.sep, "/"))
+
+
+def _content_disposition(disposition_type: str, filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition_type}; filename*=utf-8''{quoted}"
+    return f'{disposition_type}; filename="{filename}"'
+
+
+def file_response(
+        request: Request,
+        path: Union[str, PathLike],
+        content_hash: Optional[str] = None,
+        filename: Optional[str] = None,
+        content_disposition_type: str = "attachment",
+        media_type: Optional[str] = None,
+) -> Response:
+    """
+    Ответ с файлом: поддерживает Range (частичная загрузка и докачка) и,
+    если известен хеш содержимого, ETag/If-None-Match с долгим кэшированием.
+    Файлы хранилища при заданном storage.redirect отдает nginx (X-Accel-Redirect, sendfile),
+    иначе приложение читает файл и отправляет его блоками по chunk_size.
+    """
+    headers = {}
+    if content_hash:
+        etag = f'"{content_hash}"'
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    accel_uri = _accel_redirect_uri(path)
+    if accel_uri is not None:
+        # nginx сохраняет Content-Type, Content-Disposition и Cache-Control ответа, Range обрабатывает сам
+        headers["X-Accel-Redirect"] = accel_uri
+        if filename is not None:
+            headers["Content-Disposition"] = _content_disposition(content_disposition_type, filename)
+        return Response(
+            headers=headers,
+            media_type=media_type or mimetypes.guess_type(filename or path)[0] or "text/plain",
+        )
+    return BlobFileResponse(
+        path,
+        headers=headers,
+        filename=filename,
+        media_type=media_type,
+        content_disposition_type=content_disposition_type,
+    )
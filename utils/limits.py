@@ -0,0 +1,66 @@
+from fastapi import HTTPException
+from starlette import status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPART_OVERHEAD = 64 * 1024  # байт на заголовки multipart и текстовые поля формы
+
+
+class BodySizeLimitMiddleware:
+    """
+    Ограничение размера тела HTTP-запроса до его разбора приложением.
+    Запрос с Content-Length больше max_size отклоняется сразу, не читая тело;
+    тело без длины (chunked) или с неверной длиной считается по мере чтения,
+    и при превышении чтение прерывается с 413.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length")
+        if length and length.isdigit() and int(length) > self.max_size:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    # FastAPI пробрасывает HTTPException из чтения тела как есть, без 400 "error parsing the body"
+                    raise self._too_large_error()
+            return message
+
+        async def tracked_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as exc:
+            if response_started or exc.status_code != status.HTTP_413_REQUEST_ENTITY_TOO_LARGE:
+                raise
+            await self._too_large()(scope, receive, send)
+
+    def _too_large_error(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Размер запроса превышает допустимый ({self.max_size // (1024 * 1024)} МБ)"
+        )
+
+    def _too_large(self) -> JSONResponse:
+        error = self._too_large_error()
+        return JSONResponse({"detail": error.detail}, status_code=error.status_code)
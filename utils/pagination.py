@@ -0,0 +1,50 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(ts: datetime, id: int) -> str:
+    """Курсор keyset-пагинации по (ts, id)"""
+    raw = f"{ts.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")
+
+
+def encode_flag_cursor(flag: bool, id: int) -> str:
+    """Курсор keyset-пагинации по (логический признак, id)"""
+    return base64.urlsafe_b64encode(f"{int(flag)}|{id}".encode()).decode().rstrip("=")
+
+
+def decode_flag_cursor(cursor: str) -> Tuple[bool, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        flag, id = raw.split("|", 1)
+        if flag not in ("0", "1"):
+            raise ValueError(flag)
+        return flag == "1", int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")
+
+
+def encode_rank_cursor(rank: float, id: int) -> str:
+    """Курсор keyset-пагинации по (релевантность, id)"""
+    return base64.urlsafe_b64encode(f"{rank!r}|{id}".encode()).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        rank, id = raw.split("|", 1)
+        return float(rank), int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")